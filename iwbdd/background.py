@@ -1,4 +1,4 @@
-from .common import eofc_read
+from .common import eofc_read, scale_surface
 import struct
 import pygame
 from io import BytesIO
@@ -43,6 +43,8 @@ class Background:
     def __init__(self, reader=None):
         self.background_id = 0
         self.image_surface = None
+        # (width, height) -> scaled image
+        self.scaled = {}
         if reader is not None:
             self.read_background_data(reader)
 
@@ -51,6 +53,13 @@ class Background:
         data_len = struct.unpack('<L', eofc_read(reader, 4))[0]
         raw_png = eofc_read(reader, data_len)
         self.image_surface = pygame.image.load(BytesIO(raw_png)).convert_alpha()
+        self.scaled = {}
+
+    # The background scaled to w by h, built once per size.
+    def scaled_to(self, w, h):
+        if (w, h) not in self.scaled:
+            self.scaled[(w, h)] = scale_surface(self.image_surface, (w, h))
+        return self.scaled[(w, h)]
 
     def draw_to(self, w, h, dest_surf, dest_area):
         if Background.draw_surface is None or Background.draw_surface_w != w or Background.draw_surface_h != h:
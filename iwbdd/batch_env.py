@@ -0,0 +1,112 @@
+from .simulation import Simulation, InputState, Controls
+import numpy
+
+
+# Steps count independent players through the same world in lockstep, for automated play-testing.
+# The world is loaded once into a single Simulation, so tiles, collision flags and caches are shared; each instance only
+# owns its row of the state columns below and a snapshot, which is restored into that Simulation for its step and taken
+# again after.
+# Actions: (count, 4) array of held controls, in Controls order (LEFT, RIGHT, JUMP, SHOOT).
+# Observations: (count, 8) float32 rows of (screen ID, x, y, gravity velocity x, gravity velocity y, double jumps
+# available, jump held, jumping).
+# Rewards: +1 for reaching a screen that instance had not visited yet, -1 for dying.
+# Done: the player died. Dead instances stay dead, with a reward of 0, until reset.
+class BatchEnvironment:
+    observation_size = 8
+    control_bits = numpy.array([1 << control for control in Controls], dtype=numpy.int64)
+
+    def __init__(self, world_file, count, movement_resolver=None):
+        self.count = count
+        self.simulation = Simulation()
+        if movement_resolver is not None:
+            self.simulation.movement_resolver = movement_resolver
+        self.simulation.load_world_from_file(world_file)
+        self.simulation.create_player()
+        world = self.simulation.current_world
+        self.screen_ids = numpy.zeros(count, dtype=numpy.int64)
+        self.x = numpy.zeros(count, dtype=numpy.float64)
+        self.y = numpy.zeros(count, dtype=numpy.float64)
+        self.gravity_x = numpy.zeros(count, dtype=numpy.float64)
+        self.gravity_y = numpy.zeros(count, dtype=numpy.float64)
+        self.doublejump_available = numpy.zeros(count, dtype=numpy.int64)
+        self.jump_held = numpy.zeros(count, dtype=bool)
+        self.jumping = numpy.zeros(count, dtype=bool)
+        self.dead = numpy.zeros(count, dtype=bool)
+        self.frames = numpy.zeros(count, dtype=numpy.int64)
+        self.death_frames = numpy.full(count, -1, dtype=numpy.int64)
+        self.animation_states = [None] * count
+        # Per instance, the screen IDs seen, for the exploration reward
+        self.visited = [set() for i in range(count)]
+        # Per instance, everything else step() carries over, as a Simulation.snapshot: the objects of the screens that
+        # instance has awake, the ones it left resting, and when each screen last ticked. The world's objects are shared
+        # and only hold the state of the instance last stepped; restoring a snapshot unpacks just the screens it touches.
+        self.simulation.place_player(world.starting_screen_id, world.start_x, world.start_y)
+        self.initial_state = self.simulation.save_state()
+        self.initial_snapshot = self.simulation.snapshot()
+        self.snapshots = [self.initial_snapshot] * count
+        self.inputs = InputState()
+        self.observations = numpy.zeros((count, BatchEnvironment.observation_size), dtype=numpy.float32)
+        self.rewards = numpy.zeros(count, dtype=numpy.float32)
+
+    # Restarts the instances selected by mask (all by default) at the world's start and returns the observations.
+    def reset(self, mask=None):
+        world = self.simulation.current_world
+        indices = range(self.count) if mask is None else numpy.flatnonzero(mask).tolist()
+        for i in indices:
+            self._store_state(i, self.initial_state)
+            self.snapshots[i] = self.initial_snapshot
+            self.visited[i] = {world.starting_screen_id}
+        return self.observe()
+
+    def step(self, actions):
+        held = (numpy.asarray(actions).astype(bool) * BatchEnvironment.control_bits).sum(axis=1).tolist()
+        simulation = self.simulation
+        inputs = self.inputs
+        rewards = self.rewards
+        rewards[:] = 0
+        for i in range(self.count):
+            if self.dead[i]:
+                continue
+            self._load(i)
+            inputs.held = held[i]
+            simulation.step(inputs)
+            self._store(i)
+            if self.dead[i]:
+                rewards[i] = -1
+            elif int(self.screen_ids[i]) not in self.visited[i]:
+                self.visited[i].add(int(self.screen_ids[i]))
+                rewards[i] = 1
+        return self.observe(), rewards, self.dead.copy()
+
+    def observe(self):
+        obs = self.observations
+        obs[:, 0] = self.screen_ids
+        obs[:, 1] = self.x
+        obs[:, 2] = self.y
+        obs[:, 3] = self.gravity_x
+        obs[:, 4] = self.gravity_y
+        obs[:, 5] = self.doublejump_available
+        obs[:, 6] = self.jump_held
+        obs[:, 7] = self.jumping
+        return obs
+
+    def _load(self, i):
+        self.simulation.restore(self.snapshots[i])
+
+    def _store(self, i):
+        self._store_state(i, self.simulation.save_state())
+        self.snapshots[i] = self.simulation.snapshot()
+
+    def _store_state(self, i, state):
+        self.screen_ids[i] = state[0]
+        self.x[i] = state[1]
+        self.y[i] = state[2]
+        self.gravity_x[i] = state[3][0]
+        self.gravity_y[i] = state[3][1]
+        self.doublejump_available[i] = state[4]
+        self.jump_held[i] = state[5]
+        self.jumping[i] = state[6]
+        self.dead[i] = state[7]
+        self.animation_states[i] = state[8]
+        self.frames[i] = state[9]
+        self.death_frames[i] = -1 if state[10] is None else state[10]
@@ -1,3 +1,6 @@
+import pygame
+
+
 def is_reader_stream(s):
     if callable(getattr(s, "read", None)):
         return True
@@ -9,3 +12,30 @@ def eofc_read(reader, expected):
     if len(data) < expected:
         raise RuntimeError("Unexpected EOF")
     return data
+
+
+# Nearest neighbour where size is a whole multiple of the surface's size, so every pixel is repeated exactly, and
+# smoothscale otherwise.
+def scale_surface(surface, size, dest=None):
+    w, h = surface.get_size()
+    if size[0] % w == 0 and size[1] % h == 0:
+        scale = pygame.transform.scale
+    else:
+        scale = pygame.transform.smoothscale
+    if dest is None:
+        return scale(surface, size)
+    return scale(surface, size, dest)
+
+
+# Scales the top left cols by rows grid of cell_w by cell_h cells of surface so every cell becomes out_w by out_h. Cells
+# are scaled one at a time, so smoothing never pulls in the edge of a neighbouring cell.
+def scale_cells(surface, cell_w, cell_h, cols, rows, out_w, out_h):
+    grid = surface.subsurface(pygame.Rect(0, 0, cols * cell_w, rows * cell_h))
+    if out_w % cell_w == 0 and out_h % cell_h == 0:
+        return pygame.transform.scale(grid, (cols * out_w, rows * out_h))
+    scaled = pygame.Surface((cols * out_w, rows * out_h), surface.get_flags(), surface)
+    for y in range(rows):
+        for x in range(cols):
+            cell = surface.subsurface(pygame.Rect(x * cell_w, y * cell_h, cell_w, cell_h))
+            pygame.transform.smoothscale(cell, (out_w, out_h), scaled.subsurface(pygame.Rect(x * out_w, y * out_h, out_w, out_h)))
+    return scaled
@@ -3,10 +3,11 @@ from .tileset import Tileset
 from .screen import Screen, Collision, COLLISIONTEST_COLORS, CollisionTest
 from .world import World
 from .game import Controller
+from .run_file import RunFile
 from .object import Object
 from enum import IntEnum
 import pygame
-from pygame.locals import K_f, K_m, K_r, K_s, K_x, K_n, K_LEFT, K_RIGHT, K_UP, K_DOWN, K_PAGEUP, K_PAGEDOWN, K_DELETE, K_RETURN, K_BACKSPACE, K_c, K_v, K_o, K_i
+from pygame.locals import K_f, K_m, K_r, K_s, K_x, K_n, K_LEFT, K_RIGHT, K_UP, K_DOWN, K_PAGEUP, K_PAGEDOWN, K_DELETE, K_RETURN, K_BACKSPACE, K_c, K_v, K_o, K_i, K_w, K_p, K_b
 
 
 class _mousetev:
@@ -49,6 +50,7 @@ class Editor:
     tshy2 = 0
     tsrx = 0
     tsby = 0
+    rewind_exhausted_message = "No earlier frames to rewind to."
 
     @staticmethod
     def calc():
@@ -84,6 +86,9 @@ class Editor:
         "sm_paste": K_v,
         "sm_fill_terrain": K_i,
         "sm_fill_collision": K_o,
+        "save_run": K_w,
+        "replay_run": K_p,
+        "rewind": K_b,
     }
     mode_count = 2
     collision_editor_draw = {
@@ -142,6 +147,9 @@ class Editor:
         main_loop.set_keydown_handler(Editor.key_mapping["sm_paste"], Editor.keydown_callback)
         main_loop.set_keydown_handler(Editor.key_mapping["sm_fill_terrain"], Editor.keydown_callback)
         main_loop.set_keydown_handler(Editor.key_mapping["sm_fill_collision"], Editor.keydown_callback)
+        main_loop.set_keydown_handler(Editor.key_mapping["save_run"], Editor.keydown_callback)
+        main_loop.set_keydown_handler(Editor.key_mapping["replay_run"], Editor.keydown_callback)
+        main_loop.set_keydown_handler(Editor.key_mapping["rewind"], Editor.keydown_callback)
 
         self.main_loop = main_loop
         self.world_file = world_file
@@ -164,6 +172,15 @@ class Editor:
         }
         self.collision_editor = 0
         self.screen_seg = main_loop.segment_window(0, 0, 1024, 768)
+        # What the last render_elements in a simulation mode showed: (editing mode, collisions rendered), and the FPS
+        # counter it drew
+        self.rendered = None
+        self.rendered_fps_text = None
+        self.rendered_fps_rect = None
+        # ... and the prompt message it drew, with where it drew it
+        self.rendered_prompt = None
+        self.rendered_prompt_text = None
+        self.rendered_prompt_rect = None
 
         self.sm_selection_1 = None
         self.sm_selection_2 = None
@@ -226,6 +243,7 @@ class Editor:
 
     def apply_background(self):
         self.edited_screen.background = self.background
+        self.edited_screen.dirty = True
 
     def create_new_screen(self):
         self.edited_screen = Screen(self.edited_world)
@@ -279,8 +297,10 @@ class Editor:
     @staticmethod
     def render_elements_callback(wnd):
         self = Editor.instance
-        self.render_elements(wnd)
+        return self.render_elements(wnd)
 
+    # The whole editor is drawn every frame. In the simulation modes, returns only the window rects that changed: the
+    # simulated screen's, through screen_seg, and the FPS counter's; anything else changing redraws the whole window.
     def render_elements(self, wnd):
         wnd.display.blit(self.render_cache["mode"], (1440, 320))
         passive_color = (128, 128, 128)
@@ -300,7 +320,7 @@ class Editor:
         else:
             fps_text = self.font.render("{0} FPS".format(self.main_loop.fps()), True, active_color, 0)
             self.render_cache[fpst] = fps_text
-        wnd.display.blit(fps_text, (1540, 748))
+        fps_rect = wnd.display.blit(fps_text, (1540, 748))
 
         if self.editing_mode not in EditingModeLock:
             self.edited_screen.render_to_window(self.screen_seg)
@@ -426,8 +446,31 @@ class Editor:
             self.background.draw_to(160, 120, wnd.display, (1080, 640))
         else:
             if self.editing_mode == EditingMode.SIMULATION or self.editing_mode == EditingMode.FRAMEBYFRAME:
-                self.controller.render_elements(self.screen_seg)
+                self.screen_seg.dirty_rects = self.controller.render_elements(self.screen_seg)
                 wnd.display.blit(self.render_cache["rac-active"] if self.controller.render_collisions else self.render_cache["rac-passive"], (Editor.ts_display_x, Editor.ts_display_y))
+                prompt_rect = None
+                if self.prompt_message is not None:
+                    if self.prompt_message != self.rendered_prompt:
+                        self.rendered_prompt_text = self.font.render(self.prompt_message, True, (0, 255, 0), 0)
+                    prompt_rect = wnd.display.blit(self.rendered_prompt_text, (1300, 500))
+                rendered = (self.editing_mode, self.controller.render_collisions)
+                if rendered == self.rendered:
+                    changed = [] if fps_text is self.rendered_fps_text else [fps_rect.union(self.rendered_fps_rect)]
+                    if self.prompt_message != self.rendered_prompt:
+                        # The old message's rect has to be presented too, to clear what the new one does not cover
+                        prompt_rects = [rect for rect in (prompt_rect, self.rendered_prompt_rect) if rect is not None]
+                        changed.append(prompt_rects[0].unionall(prompt_rects[1:]))
+                else:
+                    changed = None
+                self.rendered = rendered
+                self.rendered_fps_text = fps_text
+                self.rendered_fps_rect = fps_rect
+                self.rendered_prompt = self.prompt_message
+                self.rendered_prompt_rect = prompt_rect
+                return changed
+        self.rendered = None
+        self.rendered_prompt = None
+        return None
 
     def sm_to_clipboard(self):
         self.sm_clipboard = [[(0, 0, 0) for x in range(self.sm_selection_1[0], self.sm_selection_2[0] + 1)] for y in range(self.sm_selection_1[1], self.sm_selection_2[1] + 1)]
@@ -459,7 +502,7 @@ class Editor:
                     self.edited_screen.tiles[wy][wx] = (src_tile[0], src_tile[1], src_tile[2])
                 except IndexError:
                     pass
-        self.edited_screen.dirty = True
+        self.edited_screen.mark_tiles_dirty(self.sm_selection_1[0], self.sm_selection_1[1], min(self.sm_selection_1[0] + xti, Screen.SCREEN_W) - 1, min(self.sm_selection_1[1] + yti, Screen.SCREEN_H) - 1)
         self.edited_screen.dirty_collisions = True
 
     def sm_terrain_fill(self):
@@ -467,7 +510,7 @@ class Editor:
             for y in range(self.sm_selection_1[1], self.sm_selection_2[1] + 1):
                 tile = self.edited_screen.tiles[y][x]
                 self.edited_screen.tiles[y][x] = (self.ts_select_x, self.ts_select_y, tile[2])
-        self.edited_screen.dirty = True
+        self.edited_screen.mark_tiles_dirty(self.sm_selection_1[0], self.sm_selection_1[1], self.sm_selection_2[0], self.sm_selection_2[1])
 
     def sm_collision_fill(self):
         for x in range(self.sm_selection_1[0], self.sm_selection_2[0] + 1):
@@ -481,7 +524,7 @@ class Editor:
             for y in range(self.sm_selection_1[1], self.sm_selection_2[1] + 1):
                 tile = self.edited_screen.tiles[y][x]
                 self.edited_screen.tiles[y][x] = (0, 0, tile[2])
-        self.edited_screen.dirty = True
+        self.edited_screen.mark_tiles_dirty(self.sm_selection_1[0], self.sm_selection_1[1], self.sm_selection_2[0], self.sm_selection_2[1])
 
     def sm_collision_reset(self):
         for x in range(self.sm_selection_1[0], self.sm_selection_2[0] + 1):
@@ -504,6 +547,7 @@ class Editor:
     def start_simulation(self):
         if self.editing_mode == EditingMode.SIMULATION or self.editing_mode == EditingMode.FRAMEBYFRAME:
             self.controller.start_from_editor(self)
+            self.controller.start_recording(self.world_file)
             if self.editing_mode == EditingMode.FRAMEBYFRAME:
                 self.main_loop.suspend_ticking = True
 
@@ -692,13 +736,16 @@ class Editor:
                         self.edited_screen.tiles[scty][sctx] = (self.ts_select_x, self.ts_select_y, tile[2])
                     elif event.button == 3:
                         self.edited_screen.tiles[scty][sctx] = (0, 0, tile[2])
-                    self.edited_screen.dirty = True
+                    # Paint strokes repeat over the same tile on every mouse motion event
+                    if self.edited_screen.tiles[scty][sctx] != tile:
+                        self.edited_screen.mark_tiles_dirty(sctx, scty)
                 elif self.editing_mode == EditingMode.COLLISION:
                     if event.button == 1:
                         self.edited_screen.tiles[scty][sctx] = (tile[0], tile[1], self.collision_editor)
                     elif event.button == 3:
                         self.edited_screen.tiles[scty][sctx] = (tile[0], tile[1], 0)
-                    self.edited_screen.dirty_collisions = True
+                    if self.edited_screen.tiles[scty][sctx] != tile:
+                        self.edited_screen.dirty_collisions = True
         else:
             if self.editing_mode == EditingMode.SIMULATION or self.editing_mode == EditingMode.FRAMEBYFRAME and not self.locked[0]:
                 if mousebox(event.pos[0], event.pos[1], Editor.ts_display_x, Editor.ts_display_y, 100, 20):
@@ -774,6 +821,14 @@ class Editor:
     def atexit(self, ml):
         self.edited_world.write_to(self.world_file)
 
+    # Once the simulation moves again there are earlier frames, and the prompt saying there are none is out of date.
+    def clear_rewind_prompt(self):
+        if self.prompt_message == Editor.rewind_exhausted_message:
+            self.prompt_message = None
+
+    def run_file(self):
+        return self.world_file + ".run"
+
     @staticmethod
     def keydown_callback(event, ml):
         self = Editor.instance
@@ -811,11 +866,30 @@ class Editor:
                 self.start_simulation()
             elif self.editing_mode == EditingMode.FRAMEBYFRAME and event.key == Editor.key_mapping["frame_advance"]:
                 self.controller.simulate()
+                self.clear_rewind_prompt()
+            elif self.editing_mode == EditingMode.FRAMEBYFRAME and event.key == Editor.key_mapping["rewind"]:
+                if self.controller.rewind():
+                    self.clear_rewind_prompt()
+                else:
+                    self.prompt_message = Editor.rewind_exhausted_message
             elif event.key == Editor.key_mapping["exit_simulation"]:
                 self.exit_simulation_if_needed()
                 self.change_mode(EditingMode.COLLISION if self.controller.render_collisions else EditingMode.TERRAIN)
             elif event.key == Editor.key_mapping["toggle_collision_render"]:
                 self.controller.render_collisions = not self.controller.render_collisions
+            elif event.key == Editor.key_mapping["save_run"] and self.controller.recording is not None:
+                self.controller.recording.finish(self.controller)
+                self.controller.recording.write_to(self.run_file())
+                self.prompt_message = "Saved {0} frames to {1}.".format(self.controller.recording.frame_count, self.run_file())
+            elif event.key == Editor.key_mapping["replay_run"]:
+                try:
+                    run = RunFile(self.run_file())
+                except (FileNotFoundError, RuntimeError):
+                    self.prompt_message = "No run saved for this world."
+                    return
+                self.controller.start_replay(run)
+                self.controller.start_from_editor(self)
+                self.prompt_message = "Replaying {0} frames.".format(run.frame_count)
             return
         elif event.key == Editor.key_mapping["mode"]:
             self.change_mode(-1)
@@ -911,6 +985,10 @@ class Editor:
                     which = EditingMode.MODE_SWITCH_ROLLOVER_DESTINATION
         if which == self.editing_mode:
             return
+        simulating = (EditingMode.SIMULATION, EditingMode.FRAMEBYFRAME)
+        # Prompts from a simulation are about its run, and do not carry over into editing or the other way around
+        if (self.editing_mode in simulating) != (which in simulating):
+            self.prompt_message = None
         if self.editing_mode == EditingMode.SELECTION:
             self.sm_base_point = None
             self.sm_holding = False
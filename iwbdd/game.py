@@ -1,387 +1,150 @@
-from .world import World
-from .player import Player
-from .screen import CollisionTest, COLLISIONTEST_PREVENTS_MOVEMENT, COLLISIONTEST_PREVENTS_SIDE_GRAVITY, COLLISIONTEST_TRANSITIONS, Screen
+from .simulation import Simulation, Controls, InputState
+from .run_file import RunFile, RunRecorder, RunPlayer
+from .snapshot import SnapshotRing
 import pygame
-from enum import IntEnum
 
 
-def bound(v, m0, m1):
-    if v < m1:
-        if v < m0:
-            return m0
-        return v
-    return m1
+# Reads the held controls from the keyboard through a keybinding map.
+class KeyboardInputProvider:
+    def __init__(self, keybindings):
+        self.keybindings = keybindings
+        self.state = InputState()
 
-
-class Controls(IntEnum):
-    LEFT = 0
-    RIGHT = 1
-    JUMP = 2
-    SHOOT = 3
+    def poll(self):
+        keys = pygame.key.get_pressed()
+        for control, key in self.keybindings.items():
+            self.state.set(control, keys[key])
+        return self.state
 
 
-class Controller:
+class Controller(Simulation):
     instance = None
-    # terminal_velocity = 4.4
-    terminal_velocity = 3.3
-    doublejump_strength = 0.8
     default_keybindings = {
         Controls.LEFT: pygame.K_LEFT,
         Controls.RIGHT: pygame.K_RIGHT,
         Controls.JUMP: pygame.K_SPACE,
         Controls.SHOOT: pygame.K_a,
     }
-    movement_speed = 1.5
+    rewind_seconds = 10
 
     def __init__(self, main_loop):
         if Controller.instance is not None:
             raise RuntimeError("Editor must be a singleton.")
         Controller.instance = self
+        super().__init__()
 
-        self.worlds = []
-        self.current_world = None
-        self.current_screen = None
         self.keybindings = Controller.default_keybindings.copy()
+        self.keyboard_input = KeyboardInputProvider(self.keybindings)
+        self.input_provider = self.keyboard_input
+        self.recording = None
+        self.replaying = None
         self.suspended = False
         self.render_collisions = False
+        self.rewind_buffer = SnapshotRing(Controller.rewind_seconds * 60)
+        # What the last render_elements drew: (screen, collisions rendered) and the rects objects were drawn over
+        self.rendered = None
+        self.rendered_object_rects = []
 
-        self.player = None
         main_loop.add_ticker(self)
 
-    def add_loaded_world(self, world):
-        self.worlds.append(world)
-        if self.current_world is None:
-            self.current_world = world
-            self.current_screen = self.current_world.screens[self.current_world.starting_screen_id]
-            if self.player is not None:
-                self.player.x = self.current_world.start_x
-                self.player.y = self.current_world.start_y
-                self.current_screen.objects.append(self.player)
-                self.player.screen = self.current_screen
-
-    def load_world_from_file(self, world):
-        loaded_world = World(world)
-        self.worlds.append(loaded_world)
-        if self.current_world is None:
-            self.current_world = loaded_world
-            self.current_screen = self.current_world.screens[self.current_world.starting_screen_id]
-            if self.player is not None:
-                self.player.x = self.current_world.start_x
-                self.player.y = self.current_world.start_y
-                self.current_screen.objects.append(self.player)
-                self.player.screen = self.current_screen
-
-    def create_player(self):
-        if self.player is None:
-            self.player = Player()
-            if self.current_world is not None:
-                self.player.x = self.current_world.start_x
-                self.player.y = self.current_world.start_y
-                self.current_screen.objects.append(self.player)
-            self.player.screen = self.current_screen
-
     def reset_from_editor(self, editor):
-        self.player.reset()
-        self.current_screen.objects.remove(self.player)
         self.current_world = editor.edited_world
-        self.current_screen = self.current_world.screens[self.current_world.starting_screen_id]
-        self.player.screen = self.current_screen
-        self.player.x = self.current_world.start_x
-        self.player.y = self.current_world.start_y
-        self.current_screen.objects.append(self.player)
+        self.place_player(self.current_world.starting_screen_id, self.current_world.start_x, self.current_world.start_y)
+        self.rewind_buffer.clear()
         self.suspended = True
 
     def start_from_editor(self, editor):
         self.suspended = False
 
-    def transition(self, id):
-        self.current_screen.objects.remove(self.player)
-        self.current_screen = self.current_world.screens[self.current_screen.transitions[id]]
-        if id == 0:
-            self.player.x = 0
-        elif id == 1:
-            self.player.y = Screen.SCREEN_SIZE_H - len(self.player.hitbox)
-        elif id == 2:
-            self.player.x = Screen.SCREEN_SIZE_W - len(self.player.hitbox[0])
-        elif id == 3:
-            self.player.y = 0
-        self.current_screen.objects.append(self.player)
-
+    # Records every simulated frame from here on until stop_recording.
+    def start_recording(self, world_file):
+        self.stop_replay()
+        self.recording = RunFile()
+        self.recording.start_from(self, world_file)
+        self.input_provider = RunRecorder(self.keyboard_input, self.recording)
+
+    def stop_recording(self):
+        run = self.recording
+        if run is not None:
+            run.finish(self)
+            self.recording = None
+            self.input_provider = self.keyboard_input
+        return run
+
+    # Restarts from the run's starting point and feeds the run through simulate; the simulation is suspended at its end.
+    def start_replay(self, run):
+        self.stop_recording()
+        run.restore_start(self)
+        self.rewind_buffer.clear()
+        self.replaying = RunPlayer(run)
+        self.input_provider = self.replaying
+
+    def stop_replay(self):
+        if self.replaying is not None:
+            self.replaying = None
+            self.input_provider = self.keyboard_input
+
+    # Steps back one simulated frame; the recording, if any, forgets that frame too. Returns False once out of history.
+    def rewind(self):
+        snapshot = self.rewind_buffer.pop()
+        if snapshot is None:
+            return False
+        self.stop_replay()
+        self.restore(snapshot)
+        if self.recording is not None:
+            self.recording.pop()
+        return True
+
+    # The current screen's objects remember where the frame started and ended them, for drawing in between. Nothing is
+    # in between when the frame changed screens or no frame was simulated.
     def simulate(self):
+        screen = self.current_screen
         if self.suspended:
+            if screen is not None:
+                for obj in screen.objects:
+                    obj.previous_position = None
             return
-        if self.player.dead:
-            return
-        self.current_screen.generate_object_collisions()
-        # print("==== Running simulation for frame")
-        if self.player.cached_collision is None:
-            self.player.cached_collision = self.current_screen.test_screen_collision(int(self.player.x), int(self.player.y), self.player.hitbox)
-            # print("Checking initial collision at {0} {1} - result: {2}".format(int(self.player.x), int(self.player.y), self.player.cached_collision))
-        if self.player.cached_collision[4][0] & CollisionTest.DEADLY:
-            self.player.die()
-            self.player.cached_collision = None
-            return
-        if self.player.cached_collision[4][0] & COLLISIONTEST_PREVENTS_MOVEMENT:
-            self.player.y -= 1
-            self.player.cached_collision = None
-            # print("Frame failed: player overlapping solid object")
-            return
-        if self.player.cached_collision[4][0] & COLLISIONTEST_TRANSITIONS:
-            if self.player.cached_collision[4][0] & CollisionTest.TRANSITION_EAST and self.current_screen.transitions[0]:
-                self.transition(0)
-                self.player.cached_collision = None
-                return
-            elif self.player.cached_collision[4][0] & CollisionTest.TRANSITION_NORTH and self.current_screen.transitions[1]:
-                self.transition(1)
-                self.player.cached_collision = None
-                return
-            elif self.player.cached_collision[4][0] & CollisionTest.TRANSITION_WEST and self.current_screen.transitions[2]:
-                self.transition(2)
-                self.player.cached_collision = None
-                return
-            elif self.player.cached_collision[4][0] & CollisionTest.TRANSITION_SOUTH and self.current_screen.transitions[3]:
-                self.transition(3)
-                self.player.cached_collision = None
-                return
-            else:
-                print("BUG: Collision flag {0} but no valid transition in direction(s)".format(self.player.cached_collision[4][0]))
-        cancel_dirs = []
-        grav_dirs = []
-        gx = self.current_screen.gravity[0]
-        gy = self.current_screen.gravity[1]
-        gv = self.player.gravity_velocity
-        tv = Controller.terminal_velocity
-        prevent_doublejump = False
-        # gv = [bound(gv[0] + gx, -tv if gx < 0 else -2 * tv, tv if gx > 0 else 2 * tv), bound(gv[1] + gy, -tv if gy < 0 else -2 * tv, tv if gy > 0 else 2 * tv)]
-        if gx != 0:
-            if gx < 0:
-                grav_dirs.append(2)
-            else:
-                grav_dirs.append(0)
-        if gy != 0:
-            if gy < 0:
-                grav_dirs.append(1)
-            else:
-                grav_dirs.append(3)
-        jump_available = False
-        if self.player.cached_collision[0][0] & COLLISIONTEST_PREVENTS_SIDE_GRAVITY or self.player.cached_collision[2][0] & COLLISIONTEST_PREVENTS_SIDE_GRAVITY:
-            gv = [0, 0]
-            prevent_doublejump = True
-            self.player.jumping = False
-        else:
-            gv = [bound(gv[0] + gx, -tv, tv), bound(gv[1] + gy, -tv, tv)]
-            if gv[0] != 0:
-                if gv[0] < 0:
-                    cancel_dirs.append(2)
-                else:
-                    cancel_dirs.append(0)
-            if gv[1] != 0:
-                if gv[1] < 0:
-                    cancel_dirs.append(1)
-                else:
-                    cancel_dirs.append(3)
-            for el in cancel_dirs:
-                if self.player.cached_collision[el][0] & COLLISIONTEST_PREVENTS_MOVEMENT:
-                    if el in (0, 2):
-                        gv[0] = 0
-                    else:
-                        gv[1] = 0
-        for el in grav_dirs:
-            if self.player.cached_collision[el][0] & COLLISIONTEST_PREVENTS_MOVEMENT:
-                jump_available = True
-                if self.player.doublejump_available < 1:
-                    self.player.doublejump_available = 1
-                self.player.jumping = False
-
-        # if gx:
-        #    tgvrx = tv / gx
-        # else:
-        #     tgvrx = 0
-
-        # if gy:
-        #     tgvry = tv / gy
-        # else:
-        #     tgvry = 0
-
-        mvx = 0
-        mvy = 0
-        change_facing = 0
-        keys = pygame.key.get_pressed()
-        if keys[self.keybindings[Controls.LEFT]]:
-            mvx += -Controller.movement_speed
-            change_facing = -1
-        if keys[self.keybindings[Controls.RIGHT]]:
-            mvx += Controller.movement_speed
-            if change_facing == -1:
-                change_facing = 0
-            else:
-                change_facing = 1
-        if keys[self.keybindings[Controls.JUMP]]:
-            if not self.player.jump_held:
-                self.player.jump_held = True
-                if jump_available:
-                    # gv[0] += tgvrx * -gx
-                    # gv[1] += tgvry * -gy
-                    gv[0] += -gx * self.current_screen.jump_frames
-                    gv[1] += -gy * self.current_screen.jump_frames
-                    self.player.jumping = True
-                elif self.player.doublejump_available > 0 and not prevent_doublejump:
-                    if gx:
-                        if (gv[0] < 0 and gx < 0) or (gv[0] > 0 and gx > 0):
-                            gv[0] = 0
-                    if gy:
-                        if (gv[1] < 0 and gy < 0) or (gv[1] > 0 and gy > 0):
-                            gv[1] = 0
-                    # gv[0] += tgvrx * -gx * Controller.doublejump_strength
-                    # gv[1] += tgvry * -gy * Controller.doublejump_strength
-                    gv[0] += -gx * self.current_screen.jump_frames * Controller.doublejump_strength
-                    gv[1] += -gy * self.current_screen.jump_frames * Controller.doublejump_strength
-                    self.player.jumping = True
-                    self.player.doublejump_available -= 1
-        else:
-            if self.player.jump_held:
-                self.player.jump_held = False
-                if self.player.jumping:
-                    self.player.jumping = False
-                    if gx:
-                        if (gv[0] < 0 and gx > 0) or (gv[0] > 0 and gx < 0):
-                            gv[0] = 0
-                    if gy:
-                        if (gv[1] < 0 and gy > 0) or (gv[1] > 0 and gy < 0):
-                            gv[1] = 0
-
-        self.player.gravity_velocity = gv
-        self.player.movement_velocity = [mvx, mvy]
-
-        conveyor_velocity = [0, 0]
-        if self.player.cached_collision[0][0] & CollisionTest.CONVEYOR_NORTH_SINGLE_SPEED or self.player.cached_collision[2][0] & CollisionTest.CONVEYOR_NORTH_SINGLE_SPEED:
-            conveyor_velocity[1] += -Controller.movement_speed * 0.75
-        if self.player.cached_collision[0][0] & CollisionTest.CONVEYOR_SOUTH_SINGLE_SPEED or self.player.cached_collision[2][0] & CollisionTest.CONVEYOR_SOUTH_SINGLE_SPEED:
-            conveyor_velocity[1] += Controller.movement_speed * 0.75
-        if self.player.cached_collision[3][0] & CollisionTest.CONVEYOR_WEST_SINGLE_SPEED:
-            conveyor_velocity[0] += -Controller.movement_speed * 0.75
-        if self.player.cached_collision[3][0] & CollisionTest.CONVEYOR_EAST_SINGLE_SPEED:
-            conveyor_velocity[0] += Controller.movement_speed * 0.75
-
-        if change_facing:
-            if change_facing < 0:
-                if self.player.state != "moving_left":
-                    self.player.state = "moving_left"
-            else:
-                if self.player.state != "moving_right":
-                    self.player.state = "moving_right"
-        elif self.player.state != "stop_left" and self.player.state != "stop_right":
-            if self.player.state == "moving_left":
-                self.player.state = "stop_left"
-            else:
-                self.player.state = "stop_right"
-
-        sumv = (gv[0] + mvx + conveyor_velocity[0], gv[1] + mvy + conveyor_velocity[1])
-        dest = [self.player.x + sumv[0], self.player.y + sumv[1]]
-        cx = self.player.x
-        cy = self.player.y
-        sgnx = -1 if sumv[0] < 0 else 1
-        sgny = -1 if sumv[1] < 0 else 1
-        prevent_y = False
-        if not sumv[1] or self.player.cached_collision[1 if sgny < 0 else 3][0] & COLLISIONTEST_PREVENTS_MOVEMENT:
-            prevent_y = True
-            dest[1] = self.player.y
-        prevent_x = False
-        sloping = 0
-        if sumv[0]:
-            xdir = 2 if sgnx < 0 else 0
-            if self.player.cached_collision[xdir][0] & COLLISIONTEST_PREVENTS_MOVEMENT:
-                if self.player.cached_collision[xdir][1] != 1 or self.player.cached_collision[xdir][2] not in (0, self.player.bottom_pixel) or (self.player.cached_collision[1][0] & COLLISIONTEST_PREVENTS_MOVEMENT and self.player.cached_collision[xdir][2] == self.player.bottom_pixel) or (self.player.cached_collision[3][0] & COLLISIONTEST_PREVENTS_MOVEMENT and self.player.cached_collision[xdir][2] == 0):
-                    prevent_x = True
-                    dest[0] = self.player.x
-                elif self.player.cached_collision[xdir][2] == self.player.bottom_pixel and not self.player.cached_collision[1][0] & COLLISIONTEST_PREVENTS_MOVEMENT:
-                    sloping = -1
-                elif self.player.cached_collision[xdir][2] == 0 and not self.player.cached_collision[3][0] & COLLISIONTEST_PREVENTS_MOVEMENT:
-                    sloping = 1
-                else:
-                    prevent_x = True
-                    dest[0] = self.player.x
-        else:
-            prevent_x = True
-            dest[0] = self.player.x
-        acc_tx = 0
-        acc_ty = 0
-        while True:
-            # print("=== Running iteration of discrete simulation [current location: {0} {1}]".format(cx, cy))
-            nx = int(cx) + sgnx
-            ny = int(cy) + sgny
-            if sumv[0] and not prevent_x:
-                nxt = acc_tx + (nx - cx) / sumv[0]
-            else:
-                nxt = 2
-            if sumv[1] and not prevent_y:
-                nyt = acc_ty + (ny - cy) / sumv[1]
-            else:
-                nyt = 2
-            if (nxt > 1 or prevent_x) and (nyt > 1 or prevent_y):
-                break
-            elif nxt <= nyt and not prevent_x:
-                if sloping:
-                    cy += sloping
-                    dest[1] += sloping
-                pt = (nx, int(cy))
-                cx = nx
-                acc_tx = nxt
-            elif not prevent_y:
-                pt = (int(cx), ny)
-                cy = ny
-                acc_ty = nyt
-            else:
-                break
-            coll = self.current_screen.test_screen_collision(pt[0], pt[1], self.player.hitbox)
-            overlap = coll[4][0]
-            if overlap & CollisionTest.DEADLY:
-                self.player.die()
-                return
-            # print("Checking collision at {0} {1} - result: {2}".format(pt[0], pt[1], coll))
-            # if coll[3][0] & COLLISIONTEST_PREVENTS_MOVEMENT:
-            #     print("Next iteration will overlap with terrain.")
-            # if overlap & COLLISIONTEST_PREVENTS_MOVEMENT:
-            #     print("Detected overlap of terrain.")
-            xdir = coll[2 if sgnx < 0 else 0]
-            ydir = coll[1 if sgny < 0 else 3]
-            if not prevent_y and ydir[0] & COLLISIONTEST_PREVENTS_MOVEMENT:
-                prevent_y = True
-                dest[1] = pt[1]
-            if not prevent_x and xdir[0] & COLLISIONTEST_PREVENTS_MOVEMENT:
-                if xdir[1] != 1 or xdir[2] not in (0, self.player.bottom_pixel) or (coll[1][0] & COLLISIONTEST_PREVENTS_MOVEMENT and xdir[2] == self.player.bottom_pixel) or (coll[3][0] & COLLISIONTEST_PREVENTS_MOVEMENT and xdir[2] == 0):
-                    prevent_x = True
-                    dest[0] = pt[0]
-                    sloping = 0
-                elif xdir[2] == self.player.bottom_pixel and not coll[1][0] & COLLISIONTEST_PREVENTS_MOVEMENT:
-                    sloping = -1
-                elif xdir[2] == 0 and not coll[3][0] & COLLISIONTEST_PREVENTS_MOVEMENT:
-                    sloping = 1
-                else:
-                    prevent_x = True
-                    dest[0] = pt[0]
-            else:
-                sloping = 0
-            self.player.x = pt[0]
-            self.player.y = pt[1]
-        self.player.x = dest[0]
-        self.player.y = dest[1]
-        self.player.cached_collision = None
+        self.rewind_buffer.push(self.snapshot())
+        for obj in screen.objects:
+            obj.previous_position = (obj.x, obj.y)
+        self.step(self.input_provider.poll())
+        for obj in self.current_screen.objects:
+            if self.current_screen is not screen:
+                obj.previous_position = None
+            obj.ticked_position = (obj.x, obj.y)
+        if self.replaying is not None and self.replaying.finished():
+            if not self.replaying.run.matches(self):
+                print("Replay diverged: ended at {0}, recorded {1}".format(RunFile.state_of(self), tuple(self.replaying.run.final_state)))
+            self.stop_replay()
+            self.suspended = True
 
     @staticmethod
     def render_elements_callback(wnd):
         self = Controller.instance
-        self.render_elements(wnd)
+        return self.render_elements(wnd)
 
+    # Returns the window rects that changed since the last call, or None if the whole window did.
     def render_elements(self, wnd):
-        if self.current_screen is not None:
-            self.current_screen.render_to_window(wnd)
-            if self.render_collisions:
-                self.current_screen.render_collisions_to_window(wnd)
-            if not self.render_collisions:
-                self.current_screen.render_objects(wnd)
-            else:
-                self.current_screen.render_objects_hitboxes(wnd)
+        if self.current_screen is None:
+            self.rendered = None
+            return None
+        changed = self.current_screen.render_to_window(wnd)
+        if self.render_collisions:
+            changed.extend(self.current_screen.render_collisions_to_window(wnd))
+        if not self.render_collisions:
+            object_rects = self.current_screen.render_objects(wnd)
+        else:
+            object_rects = self.current_screen.render_objects_hitboxes(wnd)
+        rendered = (self.current_screen, self.render_collisions)
+        if rendered != self.rendered:
+            changed = None
+        else:
+            # Objects have to be cleared from where they were as well as drawn where they are
+            changed.extend(self.rendered_object_rects)
+            changed.extend(object_rects)
+        self.rendered = rendered
+        self.rendered_object_rects = object_rects
+        return changed
 
     def __call__(self, ml):
         self.simulate()
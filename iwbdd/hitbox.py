@@ -0,0 +1,69 @@
+import numpy
+
+
+# Neighbour offsets in collision result order: [E, N, W, S]
+EDGE_DIRECTIONS = ((1, 0), (0, -1), (-1, 0), (0, 1))
+
+
+# Immutable hitbox that still reads like the list of rows it was built from (hitbox[yo][xo], len(hitbox)),
+# with the layouts collision code wants precomputed:
+# spans:       per row, the (start, end) column ranges of set pixels
+# mask:        read-only numpy bool array of the set pixels
+# edges:       per direction, the pixels just outside the hitbox that a one pixel move in that direction uncovers
+# edge_bounds: per direction, the (x, y, w, h) bounding box of those pixels
+class CompiledHitbox(tuple):
+    def __new__(cls, rows):
+        return super().__new__(cls, (tuple(1 if px else 0 for px in row) for row in rows))
+
+    def __init__(self, rows):
+        self.height = len(self)
+        self.width = len(self[0]) if self.height else 0
+        spans = []
+        for row in self:
+            row_spans = []
+            start = None
+            for xo, px in enumerate(row):
+                if px and start is None:
+                    start = xo
+                elif not px and start is not None:
+                    row_spans.append((start, xo))
+                    start = None
+            if start is not None:
+                row_spans.append((start, len(row)))
+            spans.append(tuple(row_spans))
+        self.spans = tuple(spans)
+        self.pixel_count = sum(end - start for row_spans in self.spans for start, end in row_spans)
+        self.mask = numpy.array(self, dtype=bool).reshape(self.height, self.width)
+        self.mask.flags.writeable = False
+        edges = []
+        edge_bounds = []
+        for dx, dy in EDGE_DIRECTIONS:
+            edge = tuple((xo + dx, yo + dy) for yo in range(self.height) for xo in range(self.width) if self[yo][xo] and not self.is_set(xo + dx, yo + dy))
+            edges.append(edge)
+            if edge:
+                x0 = min(pt[0] for pt in edge)
+                y0 = min(pt[1] for pt in edge)
+                edge_bounds.append((x0, y0, max(pt[0] for pt in edge) - x0 + 1, max(pt[1] for pt in edge) - y0 + 1))
+            else:
+                edge_bounds.append(None)
+        self.edges = tuple(edges)
+        self.edge_bounds = tuple(edge_bounds)
+
+    def is_set(self, xo, yo):
+        return 0 <= yo < self.height and 0 <= xo < self.width and self[yo][xo] == 1
+
+
+compiled_hitboxes = {}
+
+
+# Hitboxes with the same shape share one CompiledHitbox. Plain lists of rows are looked up by their shape on every call
+# and are not kept; objects hold on to the CompiledHitbox instead.
+def compile_hitbox(rows):
+    if isinstance(rows, CompiledHitbox):
+        return rows
+    key = tuple(tuple(1 if px else 0 for px in row) for row in rows)
+    compiled = compiled_hitboxes.get(key)
+    if compiled is None:
+        compiled = CompiledHitbox(key)
+        compiled_hitboxes[key] = compiled
+    return compiled
@@ -5,9 +5,14 @@ from .tileset import pack_tilesets_from_files, read_tilesets
 from .background import pack_backgrounds_from_files, read_backgrounds
 from .spritesheet import pack_spritesheets_from_files, read_spritesheets
 from .editor import Editor
+from .game import Controller
 from .object import Object
 from . import object_importer
+from .run_file import replay_run_file
+from .solver import LevelSolver
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import sys
+import time
 
 
 def ml_exit_handler(event, ml):
@@ -18,6 +23,7 @@ def main():
     m = MainLoop()
     m.init()
 
+    m.set_fixed_timestep()
     w = Window(1024, 768, "IWBDD")
     m.set_window(w)
     m.set_keydown_handler(K_ESCAPE, ml_exit_handler)
@@ -33,6 +39,7 @@ def editor():
         print("Missing argument: world file")
         sys.exit(2)
 
+    m.set_fixed_timestep()
     Object.enumerate_objects(Object)
     w = Window(1600, 768, "IWBDD Editor")
     m.set_window(w)
@@ -55,6 +62,7 @@ def editor_scaled():
         print("Missing argument: world file")
         sys.exit(2)
 
+    m.set_fixed_timestep()
     Object.enumerate_objects(Object)
     w = Window(1200, 576, "IWBDD Editor")
     scaler = w.create_scaler(1600, 768)
@@ -71,19 +79,36 @@ def editor_scaled():
     m.quit()
 
 
+# Plays a world in a window of its own size, which may differ from the screen's 1024x768; sizes that fit a whole number
+# of pixels per tile, such as 768x576 or 2048x1536, draw from pre-scaled assets.
 def world_tester():
     m = MainLoop()
     m.init()
     if len(sys.argv) == 1:
-        print("Missing argument: world file")
+        print("Missing argument: world file [window width, window height]")
         sys.exit(2)
-
-    w = Window(1024, 768, "IWBDD World Test")
+    width = 1024
+    height = 768
+    if len(sys.argv) >= 4:
+        try:
+            width = int(sys.argv[2])
+            height = int(sys.argv[3])
+        except ValueError:
+            print("Window width and height must be integers")
+            sys.exit(2)
+
+    m.set_fixed_timestep()
+    w = Window(width, height, "IWBDD World Test")
     m.set_window(w)
 
     read_tilesets("tilesets.tls")
     read_backgrounds("backgrounds.bgs")
+    read_spritesheets("spritesheets.sss")
 
+    controller = Controller(m)
+    controller.load_world_from_file(sys.argv[1])
+    controller.create_player()
+    m.add_render_callback(Controller.render_elements_callback)
     m.set_keydown_handler(K_ESCAPE, ml_exit_handler)
     m.start()
 
@@ -142,3 +167,61 @@ def pack_spritesheets():
         srcfiles[id_cntr] = elem
         id_cntr += 1
     pack_spritesheets_from_files(srcfiles, destfile)
+
+
+def run_batch():
+    args = sys.argv[1:]
+    workers = None
+    if len(args) >= 2 and args[0] == "-j":
+        workers = int(args[1])
+        args = args[2:]
+    if len(args) == 0:
+        print("Missing arguments: [-j workers] world file, run files")
+        sys.exit(2)
+    if len(args) == 1:
+        print("Missing arguments: run files")
+        sys.exit(2)
+    world_file = args[0]
+    run_files = args[1:]
+    failed = 0
+    total_frames = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(replay_run_file, run_file, world_file) for run_file in run_files]
+        for future in as_completed(futures):
+            path, state, death_frame, frames, elapsed, matches = future.result()
+            total_frames += frames
+            if not matches:
+                failed += 1
+            print("{0}: screen {1} at ({2:.2f}, {3:.2f}), {4}, {5} frames in {6:.3f}s ({7:.0f} fps){8}".format(
+                path, state[0], state[1], state[2], "alive" if death_frame is None else "died on frame {0}".format(death_frame),
+                frames, elapsed, frames / elapsed if elapsed > 0 else 0, "" if matches else " - DOES NOT MATCH RECORDING"), flush=True)
+    elapsed = time.perf_counter() - start
+    print("{0} runs, {1} failed, {2} frames in {3:.3f}s ({4:.0f} fps)".format(len(run_files), failed, total_frames, elapsed, total_frames / elapsed if elapsed > 0 else 0))
+    if failed:
+        sys.exit(1)
+
+
+def solve_world():
+    args = sys.argv[1:]
+    max_states = None
+    if len(args) >= 2 and args[0] == "-n":
+        max_states = int(args[1])
+        args = args[2:]
+    if len(args) == 0:
+        print("Missing argument: [-n max states] world file")
+        sys.exit(2)
+    world_file = args[0]
+    start = time.perf_counter()
+    solver = LevelSolver(world_file, max_states=max_states)
+    screens = solver.solve()
+    elapsed = time.perf_counter() - start
+    for screen_id in sorted(screens):
+        reachability = screens[screen_id]
+        print("Screen {0}: {1} tiles reachable, {2} states".format(screen_id, reachability.reachable_count(), reachability.states))
+        for dest_id in sorted(reachability.exits):
+            run = reachability.exits[dest_id]
+            run_file = "{0}.{1}-{2}.run".format(world_file, screen_id, dest_id)
+            run.write_to(run_file)
+            print("    exit to screen {0} in {1} frames: {2}".format(dest_id, run.frame_count, run_file))
+    print("{0} states in {1:.3f}s".format(len(solver.parents), elapsed))
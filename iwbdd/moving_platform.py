@@ -3,6 +3,106 @@ from .spritesheet import Spritesheet
 from .screen import CollisionTest
 from collections import OrderedDict
 import pygame
+import numpy
+import struct
+
+
+# A screen's moving platforms as numpy columns, advanced in one vectorized step. Instances only get written to when their
+# position changes (x, y, dx, dy: what rendering and collision read); t and forward are written back on sync().
+class PlatformBatch:
+    # Smaller batches tick one by one; numpy's per-call overhead outweighs the Python loop below this
+    min_size = 16
+
+    def __init__(self):
+        self.platforms = []
+        # Columns reflect the instances
+        self.loaded = False
+        # Columns are ahead of the instances' t and forward
+        self.unsynced = False
+        self.t = None
+        self.forward = None
+        self.speed = None
+        self.span_x = None
+        self.span_y = None
+        self.offset_x = None
+        self.offset_y = None
+        self.moved = None
+
+    def __len__(self):
+        return len(self.platforms)
+
+    def add(self, platform):
+        self.sync()
+        self.platforms.append(platform)
+        self.loaded = False
+
+    def remove(self, platform):
+        self.sync()
+        self.platforms.remove(platform)
+        self.loaded = False
+
+    # The instances were changed directly; reload the columns from them before the next vectorized step.
+    def invalidate(self):
+        self.loaded = False
+
+    def load(self):
+        platforms = self.platforms
+        self.t = numpy.array([p.t for p in platforms], dtype=numpy.float64)
+        self.forward = numpy.array([bool(p.forward) for p in platforms], dtype=bool)
+        self.speed = numpy.array([p.speed for p in platforms], dtype=numpy.float64)
+        self.span_x = numpy.array([p.dest_pos[0] - p.init_x for p in platforms], dtype=numpy.float64)
+        self.span_y = numpy.array([p.dest_pos[1] - p.init_y for p in platforms], dtype=numpy.float64)
+        self.offset_x = numpy.array([p.x - p.init_x for p in platforms], dtype=numpy.float64)
+        self.offset_y = numpy.array([p.y - p.init_y for p in platforms], dtype=numpy.float64)
+        # A platform the last tick moved one by one still has to have its dx and dy cleared if it stops
+        self.moved = numpy.array([p.dx != 0 or p.dy != 0 for p in platforms], dtype=bool)
+        self.loaded = True
+        self.unsynced = False
+
+    def sync(self):
+        if not self.unsynced:
+            return
+        for platform, t, forward in zip(self.platforms, self.t.tolist(), self.forward.tolist()):
+            platform.t = t
+            platform.forward = 1 if forward else 0
+        self.unsynced = False
+
+    def tick(self, behind=0):
+        if behind > 0 or len(self.platforms) < PlatformBatch.min_size:
+            self.sync()
+            self.loaded = False
+            for platform in self.platforms:
+                if behind > 0:
+                    platform.fast_forward(behind)
+                platform.tick()
+            return
+        if not self.loaded:
+            self.load()
+        # MovingPlatform.advance over every column
+        t = self.t
+        forward = self.forward
+        numpy.add(t, numpy.where(forward, self.speed, -self.speed), out=t)
+        turn = forward & (t > 1)
+        t[turn] = t[turn] - (t[turn] - 1)
+        bounce = ~forward & (t < 0)
+        t[bounce] = -t[bounce]
+        forward[turn] = False
+        forward[bounce] = True
+        offset_x = numpy.trunc(t * self.span_x)
+        offset_y = numpy.trunc(t * self.span_y)
+        moved = (offset_x != self.offset_x) | (offset_y != self.offset_y)
+        for i in numpy.flatnonzero(moved | self.moved).tolist():
+            platform = self.platforms[i]
+            nx = platform.init_x + int(offset_x[i])
+            ny = platform.init_y + int(offset_y[i])
+            platform.dx = nx - platform.x
+            platform.dy = ny - platform.y
+            if platform.dx != 0 or platform.dy != 0:
+                platform.move_to(nx, ny)
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+        self.moved = moved
+        self.unsynced = True
 
 
 class MovingPlatform(Object):
@@ -13,6 +113,10 @@ class MovingPlatform(Object):
         "speed": (EPType.FloatSelector, 0.0005, 0.0001, 1, 0.0001),
         "forward": (EPType.IntSelector, 1, 0, 1, 1),
     })
+    cycles = {}
+    snapshot_format = struct.Struct("<dBdddd")
+    snapshot_fields = ("t", "forward", "x", "y", "dx", "dy")
+    batch_class = PlatformBatch
 
     def __init__(self, screen, x=0, y=0, init_dict=None):
         self.dest_pos = (0, 0)
@@ -31,23 +135,70 @@ class MovingPlatform(Object):
         self.dy = 0
         self.objed_surf = None
 
-    def tick(self):
-        if self.forward:
-            self.t += self.speed
-            if self.t > 1:
-                self.t = self.t - (self.t - 1)
-                self.forward = 0
+    @staticmethod
+    def advance(t, forward, speed):
+        if forward:
+            t += speed
+            if t > 1:
+                t = t - (t - 1)
+                forward = 0
         else:
-            self.t -= self.speed
-            if self.t < 0:
-                self.t = -self.t
-                self.forward = 1
+            t -= speed
+            if t < 0:
+                t = -t
+                forward = 1
+        return t, forward
+
+    # One period of the motion at a speed, starting from the turn at t = 1: ([t], [forward], {(t, forward): index}).
+    # Every platform is on this cycle from its first turn at t = 1 on.
+    @staticmethod
+    def cycle_of(speed):
+        cycle = MovingPlatform.cycles.get(speed)
+        if cycle is None:
+            ts = []
+            forwards = []
+            index = {}
+            t, forward = 1, 0
+            while (t, forward) not in index:
+                index[(t, forward)] = len(ts)
+                ts.append(t)
+                forwards.append(forward)
+                t, forward = MovingPlatform.advance(t, forward, speed)
+            cycle = (ts, forwards, index)
+            MovingPlatform.cycles[speed] = cycle
+        return cycle
+
+    def move_to_t(self):
         nx = self.init_x + int(self.t * (self.dest_pos[0] - self.init_x))
         ny = self.init_y + int(self.t * (self.dest_pos[1] - self.init_y))
         self.dx = nx - self.x
         self.dy = ny - self.y
-        self.x = nx
-        self.y = ny
+        if self.dx != 0 or self.dy != 0:
+            self.move_to(nx, ny)
+
+    def tick(self):
+        self.t, self.forward = MovingPlatform.advance(self.t, self.forward, self.speed)
+        self.move_to_t()
+
+    # Ends up exactly where ticking frames times would, but jumps along the cached cycle instead of stepping.
+    def fast_forward(self, frames):
+        if self.speed <= 0:
+            return
+        t = self.t
+        forward = 1 if self.forward else 0
+        ts, forwards, index = MovingPlatform.cycle_of(self.speed)
+        while frames > 0 and (t, forward) not in index:
+            t, forward = MovingPlatform.advance(t, forward, self.speed)
+            frames -= 1
+        if frames > 0:
+            i = (index[(t, forward)] + frames) % len(ts)
+            t = ts[i]
+            forward = forwards[i]
+        self.t = t
+        self.forward = forward
+        self.move_to_t()
+        self.dx = 0
+        self.dy = 0
 
     def object_editor_draw(self, wnd):
         if self.objed_surf is None:
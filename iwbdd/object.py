@@ -2,11 +2,13 @@ from .pygame_oo.main_loop import MainLoop
 from pygame.locals import SRCALPHA
 import pygame
 from .screen import CollisionTest
+from .hitbox import compile_hitbox
+from .common import scale_surface
 from enum import Enum
 
 
 def generate_rectangle_hitbox(w, h):
-    return [[1 for x in range(w)] for y in range(h)]
+    return compile_hitbox([[1 for x in range(w)] for y in range(h)])
 
 
 class EPType(Enum):
@@ -32,6 +34,16 @@ class Object:
     object_editor_items = None
     no_properties_text = None
     object_name = ""
+    # struct.Struct packing snapshot_fields for savestates; objects without one are not captured
+    snapshot_format = None
+    snapshot_fields = ()
+    # Objects with a batch class are ticked through their screen's batch of that class instead of one by one
+    batch_class = None
+    # Movement over the last tick; colliders carry whatever stands on them by it
+    dx = 0
+    dy = 0
+    # The hitbox compiled when the object was registered as a collider, for the collision queries that go over colliders
+    compiled_hitbox = None
 
     @staticmethod
     def enumerate_objects(base_class):
@@ -43,31 +55,65 @@ class Object:
                 Object.enumerate_objects(item)
 
     def __init__(self, screen, x=0, y=0, init_dict=None):
+        self.object_grid = None
         self.screen = screen
-        self.x = x
-        self.y = y
         self._offset_x = 0
         self._offset_y = 0
-        self.hidden = False
         self.spritesheet = None
+        self.hitbox = None
+        self.x = x
+        self.y = y
+        self.hidden = False
         self.states = {}
         self._state = ""
         self.animation_frame = 0
         self.time_accumulator = 0
         self.last_sync_stamp = MainLoop.render_sync_stamp
-        self.hitbox = None
         self.hitbox_type = CollisionTest.PASSABLE
+        # Where the object was before and after the last simulated frame; draw goes between the two by the main loop's
+        # interpolation as long as the object is still where that frame left it
+        self.previous_position = None
+        self.ticked_position = None
 
         self.hb_bg_w = 0
         self.hb_bg_h = 0
         self.hbds_dirty = True
         self.hitbox_draw_surface = None
         self.hitbox_draw_surface_color = None
+        # (scale, hitbox_draw_surface scaled by it)
+        self.hitbox_draw_surface_scaled = None
 
         if init_dict is not None:
             for dest_var, init_val in init_dict.items():
                 setattr(self, dest_var, init_val)
 
+    @property
+    def x(self):
+        return self._x
+
+    @x.setter
+    def x(self, value):
+        self._x = value
+        if self.object_grid is not None:
+            self.object_grid.move(self)
+
+    @property
+    def y(self):
+        return self._y
+
+    @y.setter
+    def y(self, value):
+        self._y = value
+        if self.object_grid is not None:
+            self.object_grid.move(self)
+
+    # Sets x and y with a single object grid update.
+    def move_to(self, x, y):
+        self._x = x
+        self._y = y
+        if self.object_grid is not None:
+            self.object_grid.move(self)
+
     @property
     def offset_x(self):
         return self._offset_x
@@ -76,6 +122,8 @@ class Object:
     def offset_x(self, value):
         self.hbds_dirty = True
         self._offset_x = value
+        if self.object_grid is not None:
+            self.object_grid.move(self)
 
     @property
     def offset_y(self):
@@ -85,6 +133,8 @@ class Object:
     def offset_y(self, value):
         self.hbds_dirty = True
         self._offset_y = value
+        if self.object_grid is not None:
+            self.object_grid.move(self)
 
     @property
     def state(self):
@@ -97,9 +147,18 @@ class Object:
         self.animation_frame = 0
         self.last_sync_stamp = MainLoop.render_sync_stamp
 
-    def draw(self, wnd):
-        ix = int(self.x)
-        iy = int(self.y)
+    # scale: (x, y) factor from screen pixels to wnd pixels, or None to draw unscaled.
+    def draw_position(self):
+        if self.previous_position is None or self.ticked_position != (self.x, self.y) or MainLoop.instance is None:
+            return self.x, self.y
+        t = MainLoop.instance.interpolation
+        px, py = self.previous_position
+        return px + (self.x - px) * t, py + (self.y - py) * t
+
+    def draw(self, wnd, scale=None):
+        x, y = self.draw_position()
+        ix = int(x)
+        iy = int(y)
         if not self.hidden and self.spritesheet is not None and self._state in self.states:
             draw_x = ix + self._offset_x
             draw_y = iy + self._offset_y
@@ -119,46 +178,88 @@ class Object:
                         if self.animation_frame >= len(state[2]):
                             self._state = state[3]
                             self.animation_frame = 0
-                            self.draw(wnd)
+                            self.draw(wnd, scale)
                             return
 
-                self.spritesheet.draw_cell_to(wnd.display, state[2][self.animation_frame][0], state[2][self.animation_frame][1], draw_x, draw_y)
+                self.spritesheet.draw_cell_to(wnd.display, state[2][self.animation_frame][0], state[2][self.animation_frame][1], draw_x, draw_y, scale)
             else:
-                self.spritesheet.draw_cell_to(wnd.display, state[1][0], state[1][1], draw_x, draw_y)
+                self.spritesheet.draw_cell_to(wnd.display, state[1][0], state[1][1], draw_x, draw_y, scale)
 
     def object_editor_draw(self, wnd):
         self.draw(self, wnd)
 
-    def draw_as_hitbox(self, wnd, color):
+    # Hitbox and sprite cell combined; what the screen's object grid buckets the object by.
+    def bounding_rect(self):
+        rect = self.hitbox_rect()
+        if self.spritesheet is not None:
+            rect.union_ip(pygame.Rect(int(self.x) + self._offset_x, int(self.y) + self._offset_y, self.spritesheet.cell_w, self.spritesheet.cell_h))
+        return rect
+
+    # Everything draw touches, in screen pixels, plus the bounding rect where the object is if draw interpolated.
+    def drawn_rect(self):
+        rect = self.bounding_rect()
+        x, y = self.draw_position()
+        if int(x) != int(self.x) or int(y) != int(self.y):
+            rect.union_ip(rect.move(int(x) - int(self.x), int(y) - int(self.y)))
+        return rect
+
+    def hitbox_rect(self):
+        if self.hitbox is None:
+            return pygame.Rect(int(self.x), int(self.y), 0, 0)
+        return pygame.Rect(int(self.x), int(self.y), len(self.hitbox[0]), len(self.hitbox))
+
+    def draw_as_hitbox(self, wnd, color, scale=None):
         ix = int(self.x)
         iy = int(self.y)
         if self.hitbox is None:
             return
         if self.hbds_dirty or self.hitbox_draw_surface is None or color != self.hitbox_draw_surface_color:
-            h = len(self.hitbox)
-            w = len(self.hitbox[0])
+            hitbox = compile_hitbox(self.hitbox)
+            h = hitbox.height
+            w = hitbox.width
             self.hitbox_draw_surface = pygame.Surface((w if w > self.hb_bg_w else self.hb_bg_w, h if h > self.hb_bg_h else self.hb_bg_h), SRCALPHA)
             self.hitbox_draw_surface_color = color
+            self.hitbox_draw_surface_scaled = None
             self.hbds_dirty = False
             with pygame.PixelArray(self.hitbox_draw_surface) as hdpa:
                 fill = (color[0], color[1], color[2], 0) if self.hb_bg_w == 0 or self.hb_bg_h == 0 else (color[0], color[1], color[2], 64)
                 hdpa[:] = fill
-                for yo in range(h):
-                    for xo in range(w):
-                        if self.hitbox[yo][xo]:
-                            if self.hb_bg_w == 0 or self.hb_bg_h == 0:
-                                hdpa[xo, yo] = (color[0], color[1], color[2], 255)
-                            else:
-                                hdpa[xo + abs(self._offset_x), yo + abs(self._offset_y)] = (color[0], color[1], color[2], 255)
+                if self.hb_bg_w == 0 or self.hb_bg_h == 0:
+                    ox = 0
+                    oy = 0
+                else:
+                    ox = abs(self._offset_x)
+                    oy = abs(self._offset_y)
+                for yo, spans in enumerate(hitbox.spans):
+                    for start, end in spans:
+                        hdpa[ox + start:ox + end, oy + yo] = (color[0], color[1], color[2], 255)
         if self.hb_bg_w == 0 or self.hb_bg_h == 0:
             dest = (ix, iy)
         else:
             dest = (ix + self._offset_x, iy + self._offset_y)
-        wnd.display.blit(self.hitbox_draw_surface, dest)
+        if scale is None:
+            wnd.display.blit(self.hitbox_draw_surface, dest)
+            return
+        if self.hitbox_draw_surface_scaled is None or self.hitbox_draw_surface_scaled[0] != scale:
+            w, h = self.hitbox_draw_surface.get_size()
+            self.hitbox_draw_surface_scaled = (scale, scale_surface(self.hitbox_draw_surface, (max(1, round(w * scale[0])), max(1, round(h * scale[1])))))
+        wnd.display.blit(self.hitbox_draw_surface_scaled[1], (int(dest[0] * scale[0]), int(dest[1] * scale[1])))
 
     def tick(self):
         pass
 
+    def pack_state(self):
+        return self.snapshot_format.pack(*(getattr(self, field) for field in self.snapshot_fields))
+
+    def unpack_state(self, data):
+        for field, value in zip(self.snapshot_fields, self.snapshot_format.unpack(data)):
+            setattr(self, field, value)
+
+    # Catches up on frames slept through while off the scheduled screens; objects with closed-form motion override this.
+    def fast_forward(self, frames):
+        for i in range(frames):
+            self.tick()
+
     @classmethod
     def render_editor_properties(cls, surf, font, x, y, render_cache):
         if cls.exclude_from_object_editor:
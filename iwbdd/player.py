@@ -1,5 +1,7 @@
+import pygame
 from .object import Object, generate_rectangle_hitbox
 from .spritesheet import Spritesheet
+from .screen import CollisionResult
 
 
 class Player(Object):
@@ -13,13 +15,16 @@ class Player(Object):
         self.offset_y = -6
         # self.hb_bg_w = 16
         # self.hb_bg_h = 16
-        self.spritesheet = Spritesheet.spritesheets[1]
+        # Missing when running headless without assets loaded
+        self.spritesheet = Spritesheet.spritesheets.get(1)
         self.movement_velocity = [0, 0]
         self.gravity_velocity = [0, 0]
         self.doublejump_available = 1
         self.jump_held = False
         self.jumping = False
         self.cached_collision = None
+        # Buffer cached_collision is queried into
+        self.collision_result = CollisionResult()
         self.dead = False
         self.states = {
             "stop_left": (False, (0, 1)),
@@ -28,7 +33,7 @@ class Player(Object):
             "moving_right": (True, 0.1, [(0, 0), (1, 0)], True),
         }
         dja = Object(None, 0, 0)
-        dja.spritesheet = Spritesheet.spritesheets[2]
+        dja.spritesheet = Spritesheet.spritesheets.get(2)
         dja.hidden = True
         dja.offset_x = self.offset_x
         dja.offset_y = self.offset_y
@@ -49,14 +54,16 @@ class Player(Object):
         self.gravity_velocity = (0, 0)
         self.doublejump_available = 1
         self.cached_collision = None
-        self.spritesheet.applied_color = None
+        if self.spritesheet is not None:
+            self.spritesheet.applied_color = None
         self.dead = False
         self.jump_held = False
         self.jumping = False
         self.state = "stop_right"
 
     def die(self):
-        self.spritesheet.applied_color = (255, 0, 0)
+        if self.spritesheet is not None:
+            self.spritesheet.applied_color = (255, 0, 0)
         self.dead = True
 
     def update_attachments(self):
@@ -74,10 +81,19 @@ class Player(Object):
             else:
                 dja._state = "5+"
 
-    def draw(self, wnd):
-        super().draw(wnd)
+    def drawn_rect(self):
+        rect = super().drawn_rect()
+        for x, y in (self.draw_position(), (self.x, self.y)):
+            for k, elem in self.attachments.items():
+                if elem.spritesheet is not None:
+                    rect.union_ip(pygame.Rect(int(x) + elem._offset_x, int(y) + elem._offset_y, elem.spritesheet.cell_w, elem.spritesheet.cell_h))
+        return rect
+
+    def draw(self, wnd, scale=None):
+        super().draw(wnd, scale)
         self.update_attachments()
+        x, y = self.draw_position()
         for k, elem in self.attachments.items():
-            elem.x = self.x
-            elem.y = self.y
-            elem.draw(wnd)
+            elem.x = x
+            elem.y = y
+            elem.draw(wnd, scale)
@@ -25,6 +25,18 @@ class MainLoop:
         self.prepare_exit = False
         MainLoop.render_sync_stamp = 0
         self.clock = pygame.time.Clock()
+        self.render_fps = 60
+        # Fixed timestep mode: tickers run tick_rate times per second of real time, at most max_ticks_per_frame times per
+        # rendered frame, and interpolation is how far real time is past the last tick, in ticks (0 to 1). Objects are drawn
+        # that far from where the last tick started them towards where it left them; it stays 1 when ticks are not paced.
+        self.fixed_timestep = False
+        self.tick_rate = 60
+        self.max_ticks_per_frame = 5
+        self.accumulator = 0
+        self.interpolation = 1
+        # Renderers return the window rects they changed, or None when they cannot tell; only changed rects are presented
+        # unless full_refresh is set, which it is for the first frame and whenever the window needs repainting.
+        self.full_refresh = True
 
     def init(self):
         if self.was_init:
@@ -92,12 +104,48 @@ class MainLoop:
     def add_atexit_callback(self, cb):
         self.atexit.append(cb)
 
+    # render_fps of 0 renders as fast as possible.
+    def set_fixed_timestep(self, tick_rate=60, max_ticks_per_frame=5, render_fps=60):
+        self.fixed_timestep = True
+        self.tick_rate = tick_rate
+        self.max_ticks_per_frame = max_ticks_per_frame
+        self.render_fps = render_fps
+        self.accumulator = 0
+        self.interpolation = 1
+
+    def run_tickers(self, elapsed):
+        if not self.fixed_timestep:
+            if not self.suspend_ticking:
+                for ticker in self.tickers:
+                    ticker(self)
+            return
+        if self.suspend_ticking:
+            self.accumulator = 0
+            self.interpolation = 1
+            return
+        step = 1 / self.tick_rate
+        self.accumulator += elapsed / 1000
+        ticks = 0
+        while self.accumulator >= step:
+            if ticks >= self.max_ticks_per_frame:
+                # Too far behind to catch up; drop the backlog so the game slows down instead of spiralling.
+                self.accumulator %= step
+                break
+            for ticker in self.tickers:
+                ticker(self)
+            self.accumulator -= step
+            ticks += 1
+        self.interpolation = self.accumulator / step
+
     def start(self):
+        self.clock.tick()
         while True:
-            self.clock.tick(60)
+            elapsed = self.clock.tick(self.render_fps)
             for event in pygame.event.get():
                 if event.type == QUIT:
                     self.break_main_loop()
+                elif event.type in (VIDEOEXPOSE, VIDEORESIZE):
+                    self.full_refresh = True
                 elif event.type == KEYDOWN:
                     if event.key in self.keydown_handlers:
                         self.keydown_handlers[event.key](event, self)
@@ -113,10 +161,22 @@ class MainLoop:
                 break
             self.window.display.fill(0)
             MainLoop.render_sync_stamp = pygame.time.get_ticks() / 1000
-            if not self.suspend_ticking:
-                for ticker in self.tickers:
-                    ticker(self)
+            self.run_tickers(elapsed)
+            rects = None if self.full_refresh else []
             for renderer in self.renderers:
-                renderer(self.window)
+                changed = renderer(self.window)
+                if changed is None:
+                    rects = None
+                elif rects is not None:
+                    rects.extend(changed)
             for updatable in self.updatables:
-                updatable.update()
+                if isinstance(updatable, WindowSection):
+                    # The window under the section was cleared, so a full present needs all of it
+                    if rects is None:
+                        updatable.dirty_rects = None
+                    changed = updatable.update()
+                    if rects is not None:
+                        rects.extend(changed)
+                else:
+                    rects = updatable.update(rects)
+            self.full_refresh = False
@@ -1,5 +1,6 @@
 import pygame
 import pygame.display
+import math
 
 
 class Window:
@@ -15,8 +16,13 @@ class Window:
         self.display = pygame.display.set_mode((w, h))
         pygame.display.set_caption(title)
 
-    def update(self):
-        pygame.display.update()
+    # rects: the areas of the display that changed this frame, or None to present all of it.
+    def update(self, rects=None):
+        if rects is None:
+            pygame.display.update()
+        else:
+            pygame.display.update(rects)
+        return rects
 
     def create_scaler(self, dest_w, dest_h):
         return WindowScaler(self, dest_w, dest_h)
@@ -36,9 +42,39 @@ class WindowScaler:
         self.window = window
         self.mult_x = dest_w / window.w
         self.mult_y = dest_h / window.h
-
-    def update(self):
-        pygame.transform.smoothscale(self.display, (self.window.w, self.window.h), self.window.display)
+        # Whole multiple upscales repeat pixels exactly, so they skip the filtering
+        if window.w % dest_w == 0 and window.h % dest_h == 0:
+            self.scale = pygame.transform.scale
+        else:
+            self.scale = pygame.transform.smoothscale
+
+    # Scales only the changed rects and returns where they landed in the window. Each rect is widened to where scaler and
+    # window pixels line up and scaled with a step of margin, so smoothing at its edges sees the same neighbours as in a
+    # full scale.
+    def update(self, rects=None):
+        if rects is None:
+            self.scale(self.display, (self.window.w, self.window.h), self.window.display)
+            return None
+        step_x = self.w // math.gcd(self.w, self.window.w)
+        step_y = self.h // math.gcd(self.h, self.window.h)
+        scaled = []
+        for rect in rects:
+            x0 = max(0, rect.x // step_x * step_x)
+            y0 = max(0, rect.y // step_y * step_y)
+            x1 = min(self.w, -(-rect.right // step_x) * step_x)
+            y1 = min(self.h, -(-rect.bottom // step_y) * step_y)
+            if x0 >= x1 or y0 >= y1:
+                continue
+            mx0 = max(0, x0 - step_x)
+            my0 = max(0, y0 - step_y)
+            mx1 = min(self.w, x1 + step_x)
+            my1 = min(self.h, y1 + step_y)
+            src = self.display.subsurface(pygame.Rect(mx0, my0, mx1 - mx0, my1 - my0))
+            out = self.scale(src, ((mx1 - mx0) * self.window.w // self.w, (my1 - my0) * self.window.h // self.h))
+            dest = pygame.Rect(x0 * self.window.w // self.w, y0 * self.window.h // self.h, (x1 - x0) * self.window.w // self.w, (y1 - y0) * self.window.h // self.h)
+            inner = pygame.Rect(dest.x - mx0 * self.window.w // self.w, dest.y - my0 * self.window.h // self.h, dest.w, dest.h)
+            scaled.append(self.window.display.blit(out, dest.topleft, inner))
+        return scaled
 
     def scale_event(self, ev):
         ev.pos = [int(ev.pos[0] * self.mult_x), int(ev.pos[1] * self.mult_y)]
@@ -56,9 +92,19 @@ class WindowSection(Window):
         self.h = h
         self.window = window
         self.display = pygame.Surface((w, h))
+        # Areas of the section drawn into this frame, in section coordinates, set by whoever draws it; None means all of it
+        self.dirty_rects = None
 
+    # Returns the window rects that changed. The window under the section is cleared every frame, so the section is always
+    # blitted whole; scaling and presenting are what stay limited to the dirty rects.
     def update(self):
         self.window.display.blit(self.display, (self.x, self.y))
+        bounds = pygame.Rect(self.x, self.y, self.w, self.h)
+        if self.dirty_rects is None:
+            return [bounds]
+        changed = [rect.move(self.x, self.y).clip(bounds) for rect in self.dirty_rects]
+        self.dirty_rects = None
+        return changed
 
     def scale_event(self, ev):
         return ev
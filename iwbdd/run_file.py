@@ -0,0 +1,217 @@
+from .common import eofc_read
+from .simulation import Simulation, InputState
+import struct
+import time
+
+
+# Format: (HEADER, [RUN], FINAL STATE)
+# Header: (<2> Version, <2> World file name length, <?> World file name, START STATE, <4> Number of frames, <4> Number of runs)
+# Start state: (<4> Starting screen ID, <8> Start X, <8> Start Y, <8> Gravity velocity X, <8> Gravity velocity Y,
+#               <1> Double jumps available, <1> Jump held, <1> Jumping, <1> Dead, <4> Frame, <4> Death frame or 0xFFFFFFFF,
+#               <2> Animation state length, <?> Animation state, <4> Number of ticked screens, [<4> Screen ID, <4> Frame],
+#               <4> Number of objects, [<4> Screen ID, <4> Object index, <2> State length, <?> Packed state])
+# Version 1 start state: (<4> Starting screen ID, <8> Start X, <8> Start Y); the player starts fresh.
+# Run: (<1> Held controls bitmask, <2> Number of frames held)
+# Final state: (<4> Screen ID, <8> Player X, <8> Player Y, <1> Dead)
+class RunFile:
+    max_run_length = 0xFFFF
+
+    def __init__(self, source=None):
+        self.world_file = ""
+        self.starting_screen_id = 0
+        self.start_x = 0
+        self.start_y = 0
+        # Simulation.save_state(), pack_objects() and ticked_frames at the first frame; None for version 1 files
+        self.start_state = None
+        self.start_objects = []
+        self.start_ticked_frames = {}
+        self.frame_count = 0
+        # [held bitmask, number of frames]
+        self.runs = []
+        self.final_state = None
+        if source is not None:
+            self.read_from(source)
+
+    def read_from(self, source):
+        with open(source, 'rb') as f:
+            ver = struct.unpack("<H", eofc_read(f, 2))[0]
+            if ver == 1:
+                self._read_from_v1(f)
+            elif ver == 2:
+                self._read_from_v2(f)
+
+    def _read_from_v1(self, f):
+        name_len = struct.unpack("<H", eofc_read(f, 2))[0]
+        self.world_file = eofc_read(f, name_len).decode("utf-8")
+        self.starting_screen_id = struct.unpack("<L", eofc_read(f, 4))[0]
+        self.start_x, self.start_y = struct.unpack("<dd", eofc_read(f, 16))
+        self._read_runs(f)
+
+    def _read_from_v2(self, f):
+        name_len = struct.unpack("<H", eofc_read(f, 2))[0]
+        self.world_file = eofc_read(f, name_len).decode("utf-8")
+        screen_id, x, y, gvx, gvy, doublejump_available, jump_held, jumping, dead, frame, death_frame = struct.unpack("<LddddB???LL", eofc_read(f, 48))
+        state_len = struct.unpack("<H", eofc_read(f, 2))[0]
+        state = eofc_read(f, state_len).decode("utf-8")
+        self.starting_screen_id = screen_id
+        self.start_x = x
+        self.start_y = y
+        self.start_state = (screen_id, x, y, (gvx, gvy), doublejump_available, jump_held, jumping, dead, state, frame,
+                            death_frame if death_frame != 0xFFFFFFFF else None)
+        ticked_cnt = struct.unpack("<L", eofc_read(f, 4))[0]
+        self.start_ticked_frames = dict(struct.unpack("<LL", eofc_read(f, 8)) for i in range(ticked_cnt))
+        object_cnt = struct.unpack("<L", eofc_read(f, 4))[0]
+        self.start_objects = []
+        for i in range(object_cnt):
+            screen_id, index, data_len = struct.unpack("<LLH", eofc_read(f, 10))
+            self.start_objects.append((screen_id, index, eofc_read(f, data_len)))
+        self._read_runs(f)
+
+    def _read_runs(self, f):
+        self.frame_count = struct.unpack("<L", eofc_read(f, 4))[0]
+        run_cnt = struct.unpack("<L", eofc_read(f, 4))[0]
+        self.runs = [list(struct.unpack("<BH", eofc_read(f, 3))) for i in range(run_cnt)]
+        self.final_state = struct.unpack("<Ldd?", eofc_read(f, 21))
+
+    def write_to(self, dest):
+        with open(dest, 'wb') as f:
+            name = self.world_file.encode("utf-8")
+            f.write(struct.pack("<H", 2))
+            f.write(struct.pack("<H", len(name)))
+            f.write(name)
+            if self.start_state is not None:
+                screen_id, x, y, gv, doublejump_available, jump_held, jumping, dead, state, frame, death_frame = self.start_state
+            else:
+                screen_id, x, y, gv, doublejump_available, jump_held, jumping, dead, state, frame, death_frame = \
+                    (self.starting_screen_id, self.start_x, self.start_y, (0, 0), 1, False, False, False, "stop_right", 0, None)
+            f.write(struct.pack("<LddddB???LL", screen_id, x, y, gv[0], gv[1], doublejump_available, jump_held, jumping, dead,
+                                frame, death_frame if death_frame is not None else 0xFFFFFFFF))
+            state = state.encode("utf-8")
+            f.write(struct.pack("<H", len(state)))
+            f.write(state)
+            f.write(struct.pack("<L", len(self.start_ticked_frames)))
+            for screen_id, frame in self.start_ticked_frames.items():
+                f.write(struct.pack("<LL", screen_id, frame))
+            f.write(struct.pack("<L", len(self.start_objects)))
+            for screen_id, index, data in self.start_objects:
+                f.write(struct.pack("<LLH", screen_id, index, len(data)))
+                f.write(data)
+            f.write(struct.pack("<L", self.frame_count))
+            f.write(struct.pack("<L", len(self.runs)))
+            for held, length in self.runs:
+                f.write(struct.pack("<BH", held, length))
+            f.write(struct.pack("<Ldd?", *(self.final_state if self.final_state is not None else (0, 0, 0, False))))
+
+    def start_from(self, simulation, world_file):
+        self.world_file = world_file
+        self.starting_screen_id = simulation.current_screen.screen_id
+        self.start_x = simulation.player.x
+        self.start_y = simulation.player.y
+        self.start_state = simulation.save_state()
+        self.start_objects = simulation.pack_objects()
+        self.start_ticked_frames = simulation.ticked_frames.copy()
+
+    # A run with no frames yet that starts where this one does.
+    def restart(self):
+        run = RunFile()
+        run.world_file = self.world_file
+        run.starting_screen_id = self.starting_screen_id
+        run.start_x = self.start_x
+        run.start_y = self.start_y
+        run.start_state = self.start_state
+        run.start_objects = self.start_objects
+        run.start_ticked_frames = self.start_ticked_frames
+        return run
+
+    # Puts the simulation back in the state the run was recorded from. Version 1 files only know where the player was,
+    # so objects are left as they are.
+    def restore_start(self, simulation):
+        simulation.place_player(self.starting_screen_id, self.start_x, self.start_y)
+        if self.start_state is None:
+            return
+        simulation.load_state(self.start_state)
+        simulation.unpack_objects(self.start_objects)
+        simulation.ticked_frames = self.start_ticked_frames.copy()
+
+    def append(self, held):
+        self.frame_count += 1
+        if self.runs and self.runs[-1][0] == held and self.runs[-1][1] < RunFile.max_run_length:
+            self.runs[-1][1] += 1
+        else:
+            self.runs.append([held, 1])
+
+    def pop(self):
+        if not self.runs:
+            return
+        self.frame_count -= 1
+        self.runs[-1][1] -= 1
+        if self.runs[-1][1] == 0:
+            self.runs.pop()
+
+    def finish(self, simulation):
+        self.final_state = RunFile.state_of(simulation)
+
+    @staticmethod
+    def state_of(simulation):
+        return (simulation.current_screen.screen_id, simulation.player.x, simulation.player.y, simulation.player.dead)
+
+    def matches(self, simulation):
+        return self.final_state is not None and tuple(self.final_state) == RunFile.state_of(simulation)
+
+
+# Passes the wrapped provider's input through and appends every frame of it to a RunFile.
+class RunRecorder:
+    def __init__(self, input_provider, run):
+        self.input_provider = input_provider
+        self.run = run
+
+    def poll(self):
+        state = self.input_provider.poll()
+        self.run.append(state.held)
+        return state
+
+
+# Feeds a RunFile back one frame at a time; nothing is held once it runs out.
+class RunPlayer:
+    def __init__(self, run):
+        self.run = run
+        self.run_index = 0
+        self.run_frame = 0
+        self.state = InputState()
+
+    def finished(self):
+        return self.run_index >= len(self.run.runs)
+
+    def poll(self):
+        if self.finished():
+            self.state.held = 0
+            return self.state
+        held, length = self.run.runs[self.run_index]
+        self.state.held = held
+        self.run_frame += 1
+        if self.run_frame >= length:
+            self.run_index += 1
+            self.run_frame = 0
+        return self.state
+
+
+# Replays a run headless, as fast as the simulation steps, and returns the simulation in its final state.
+def replay_run(run, world_file=None, movement_resolver=None):
+    simulation = Simulation()
+    if movement_resolver is not None:
+        simulation.movement_resolver = movement_resolver
+    simulation.load_world_from_file(world_file if world_file is not None else run.world_file)
+    simulation.create_player()
+    run.restore_start(simulation)
+    simulation.run(RunPlayer(run), run.frame_count)
+    return simulation
+
+
+# Replays the run file at path and reports how it ended; what the batch runner runs in each worker process.
+# Returns (path, final state, death frame, frames, wall time in seconds, whether the final state matches the recording).
+def replay_run_file(path, world_file=None):
+    run = RunFile(path)
+    start = time.perf_counter()
+    simulation = replay_run(run, world_file)
+    elapsed = time.perf_counter() - start
+    return (path, RunFile.state_of(simulation), simulation.death_frame, run.frame_count, elapsed, run.matches(simulation))
@@ -1,9 +1,13 @@
 from enum import IntEnum, auto
+from collections import OrderedDict
 import struct
+import math
+import numpy
 import pygame
 from .background import Background
 from .tileset import Tileset
-from .common import eofc_read, is_reader_stream
+from .common import eofc_read, is_reader_stream, scale_surface
+from .hitbox import compile_hitbox
 
 
 class Collision(IntEnum):
@@ -55,6 +59,191 @@ COLLISIONTEST_COLORS = {
     CollisionTest.CONVEYOR_WEST_SINGLE_SPEED: (0, 130, 0),
     CollisionTest.CONVEYOR_SOUTH_SINGLE_SPEED: (0, 131, 0),
 }
+# (x offset, y offset, result index) of each probe: [E, N, W, S, overlap]
+COLLISION_PROBES = ((1, 0, 0), (0, -1, 1), (-1, 0, 2), (0, 1, 3), (0, 0, 4))
+
+
+# What touching a tile does to the player: conveyor velocity in units of the player's movement speed, and whether
+# gravity is suppressed while in contact.
+class ContactForce:
+    def __init__(self, vx, vy, suppresses_gravity=False):
+        self.vx = vx
+        self.vy = vy
+        self.suppresses_gravity = suppresses_gravity
+
+
+CONVEYOR_EAST_FORCE = ContactForce(0.75, 0)
+CONVEYOR_NORTH_FORCE = ContactForce(0, -0.75, True)
+CONVEYOR_WEST_FORCE = ContactForce(-0.75, 0)
+CONVEYOR_SOUTH_FORCE = ContactForce(0, 0.75, True)
+
+
+# One probe of a collision result, updated in place. Reads like the (flags, solid count, solid min yo, solid max yo)
+# tuple it replaces.
+class CollisionProbe:
+    __slots__ = ("flags", "count", "min_yo", "max_yo")
+    fields = __slots__
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.flags = 0
+        self.count = 0
+        self.min_yo = -1
+        self.max_yo = -1
+
+    def set(self, flags, count, min_yo, max_yo):
+        self.flags = flags
+        self.count = count
+        self.min_yo = min_yo
+        self.max_yo = max_yo
+
+    def __getitem__(self, field):
+        return getattr(self, CollisionProbe.fields[field])
+
+    def __len__(self):
+        return 4
+
+    def __iter__(self):
+        yield self.flags
+        yield self.count
+        yield self.min_yo
+        yield self.max_yo
+
+    def __eq__(self, other):
+        return tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return repr(tuple(self))
+
+
+# Reusable collision query result: coll[idx][field], probes in COLLISION_PROBES result order.
+class CollisionResult:
+    __slots__ = ("probes",)
+
+    def __init__(self):
+        self.probes = (CollisionProbe(), CollisionProbe(), CollisionProbe(), CollisionProbe(), CollisionProbe())
+
+    def reset(self):
+        for probe in self.probes:
+            probe.reset()
+        return self
+
+    def copy_from(self, other):
+        for probe, other_probe in zip(self.probes, other.probes):
+            probe.set(other_probe.flags, other_probe.count, other_probe.min_yo, other_probe.max_yo)
+        return self
+
+    def __getitem__(self, idx):
+        return self.probes[idx]
+
+    def __len__(self):
+        return 5
+
+    def __iter__(self):
+        return iter(self.probes)
+
+    def __eq__(self, other):
+        return len(other) == 5 and all(probe == other_probe for probe, other_probe in zip(self.probes, other))
+
+    def __repr__(self):
+        return repr(list(self.probes))
+
+
+# Uniform grid over tile cells. Objects are bucketed into every cell their bounding rect touches and
+# re-bucketed by Object whenever their position or draw offset changes.
+class ObjectGrid:
+    def __init__(self, cell_w=Tileset.TILE_W, cell_h=Tileset.TILE_H):
+        self.cell_w = cell_w
+        self.cell_h = cell_h
+        self.cells = {}
+        self.object_cells = {}
+        self.object_bounds = {}
+        self.order = {}
+        self.sequence = 0
+        # Called as listener(obj, old bounds, new bounds) on every change; bounds are None outside the grid.
+        self.listener = None
+
+    def _cell_range(self, rect):
+        return (rect.x // self.cell_w, rect.y // self.cell_h, max(rect.right - 1, rect.x) // self.cell_w, max(rect.bottom - 1, rect.y) // self.cell_h)
+
+    def _bucket(self, obj, cell_range):
+        for cy in range(cell_range[1], cell_range[3] + 1):
+            for cx in range(cell_range[0], cell_range[2] + 1):
+                cell = self.cells.get((cx, cy))
+                if cell is None:
+                    cell = set()
+                    self.cells[(cx, cy)] = cell
+                cell.add(obj)
+
+    def _unbucket(self, obj, cell_range):
+        for cy in range(cell_range[1], cell_range[3] + 1):
+            for cx in range(cell_range[0], cell_range[2] + 1):
+                cell = self.cells[(cx, cy)]
+                cell.discard(obj)
+                if not cell:
+                    del self.cells[(cx, cy)]
+
+    def insert(self, obj):
+        if obj in self.order:
+            return
+        self.order[obj] = self.sequence
+        self.sequence += 1
+        bounds = obj.bounding_rect()
+        cell_range = self._cell_range(bounds)
+        self.object_bounds[obj] = bounds
+        self.object_cells[obj] = cell_range
+        self._bucket(obj, cell_range)
+        obj.object_grid = self
+        if self.listener is not None:
+            self.listener(obj, None, bounds)
+
+    def remove(self, obj):
+        if obj not in self.order:
+            return
+        self._unbucket(obj, self.object_cells.pop(obj))
+        bounds = self.object_bounds.pop(obj)
+        del self.order[obj]
+        if obj.object_grid is self:
+            obj.object_grid = None
+        if self.listener is not None:
+            self.listener(obj, bounds, None)
+
+    def move(self, obj):
+        bounds = obj.bounding_rect()
+        old_bounds = self.object_bounds[obj]
+        if bounds == old_bounds:
+            return
+        self.object_bounds[obj] = bounds
+        cell_range = self._cell_range(bounds)
+        old_range = self.object_cells[obj]
+        if cell_range != old_range:
+            self._unbucket(obj, old_range)
+            self._bucket(obj, cell_range)
+            self.object_cells[obj] = cell_range
+        if self.listener is not None:
+            self.listener(obj, old_bounds, bounds)
+
+    # Objects whose bounding rect overlaps rect, in insertion order.
+    def query_rect(self, rect):
+        x0, y0, x1, y1 = self._cell_range(rect)
+        found = set()
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                cell = self.cells.get((cx, cy))
+                if cell is not None:
+                    found.update(cell)
+        return sorted((obj for obj in found if self.object_bounds[obj].colliderect(rect)), key=self.order.__getitem__)
+
+    def query_near(self, x, y, radius):
+        return self.query_rect(pygame.Rect(int(x) - radius, int(y) - radius, 2 * radius + 1, 2 * radius + 1))
+
+
+class CollisionBackend(IntEnum):
+    SURFACE = 0
+    TILES = 1
+    FLAGS = 2
 
 
 class Screen:
@@ -62,6 +251,10 @@ class Screen:
     SCREEN_H = 48
     SCREEN_SIZE_W = 1024
     SCREEN_SIZE_H = 768
+    # Windows that fit a whole number of pixels per tile are drawn from tileset, background and spritesheet copies scaled
+    # once to that size instead of by rescaling the composited screen; whole multiples of the tile size scale by nearest
+    # neighbour.
+    render_prescaled = True
 
     collision_overlays = {
         Collision.PASSABLE: lambda tgt, x, y: True,
@@ -94,26 +287,124 @@ class Screen:
         0x008300: CollisionTest.CONVEYOR_SOUTH_SINGLE_SPEED,
     }
 
+    # Per collision type, the CollisionTest flag of every pixel in a tile: [y][x]
+    collision_shapes = None
+    collision_shapes_array = None
+    # Per collision type, the overlay colour of every pixel in a tile: [y][x][rgb]
+    collision_stamps = None
+    # collision_stamps as pixel values of the overlay surfaces, in surfarray order: [x][y]
+    collision_stamps_mapped = None
+    # Per collision type, per column, the (start, end) row runs of pixels that prevent movement, top to bottom.
+    # The start of the first run is the surface height of the column.
+    collision_profiles = None
+    collision_flags_padding = 32
+    default_collision_backend = CollisionBackend.FLAGS
+    # Per collision type, the force applied by touching a tile of it from each side, keyed by the probe result index
+    # that finds the contact. A force registered for several sides still applies once.
+    contact_forces = {
+        Collision.CONVEYOR_EAST_SINGLE_SPEED: {3: CONVEYOR_EAST_FORCE},
+        Collision.CONVEYOR_NORTH_SINGLE_SPEED: {0: CONVEYOR_NORTH_FORCE, 2: CONVEYOR_NORTH_FORCE},
+        Collision.CONVEYOR_WEST_SINGLE_SPEED: {3: CONVEYOR_WEST_FORCE},
+        Collision.CONVEYOR_SOUTH_SINGLE_SPEED: {0: CONVEYOR_SOUTH_FORCE, 2: CONVEYOR_SOUTH_FORCE},
+    }
+    # Collision query results kept per screen, least recently used first out; 0 disables the cache
+    collision_cache_size = 256
+
+    @staticmethod
+    def build_collision_shapes():
+        if Screen.collision_shapes is None:
+            stamps = numpy.full((Collision.COLLISION_TYPE_COUNT, Tileset.TILE_H, Tileset.TILE_W, 3), 255, dtype=numpy.uint8)
+            stamp = pygame.Surface((Tileset.TILE_W, Tileset.TILE_H))
+            for collision, overlay in Screen.collision_overlays.items():
+                stamp.fill((255, 255, 255))
+                overlay(stamp, 0, 0)
+                stamps[collision] = pygame.surfarray.array3d(stamp).transpose(1, 0, 2)
+            colors = (stamps[..., 0].astype(numpy.uint32) << 16) | (stamps[..., 1].astype(numpy.uint32) << 8) | stamps[..., 2]
+            shapes_array = numpy.zeros(colors.shape, dtype=numpy.uint16)
+            for color, flag in Screen.collision_test_flags.items():
+                shapes_array[colors == color] = flag
+            Screen.collision_stamps = stamps
+            Screen.collision_shapes_array = shapes_array
+            Screen.collision_shapes = [tuple(tuple(int(flag) for flag in row) for row in shape) for shape in shapes_array]
+            Screen.collision_profiles = [Screen.build_collision_profile(shape) for shape in Screen.collision_shapes]
+        return Screen.collision_shapes
+
+    @staticmethod
+    def build_collision_profile(shape):
+        profile = []
+        for x in range(Tileset.TILE_W):
+            runs = []
+            start = None
+            for y in range(Tileset.TILE_H):
+                blocking = shape[y][x] & COLLISIONTEST_PREVENTS_MOVEMENT
+                if blocking and start is None:
+                    start = y
+                elif not blocking and start is not None:
+                    runs.append((start, y))
+                    start = None
+            if start is not None:
+                runs.append((start, Tileset.TILE_H))
+            profile.append(tuple(runs))
+        return tuple(profile)
+
     def __init__(self, world, tile_data=None):
         self.world = world
         self.screen_id = None
         self.pre_rendered_unscaled = None
         self.pre_rendered = None
+        # (tile width, tile height) pre_rendered was composited at from the scaled assets, or None if it is a rescale of
+        # pre_rendered_unscaled
+        self.pre_rendered_tile_size = None
         self.background = None
         self.dirty = True
+        # Tile aligned areas of the unscaled surface to recomposite; dirty recomposites everything
+        self.dirty_rects = []
+        self.collision_version = 0
+        # (collision version, x, y, hitbox id) -> (queried rect, result)
+        self.collision_cache = OrderedDict()
+        self.collision_cache_transitions = None
+        self.collision_cache_hits = 0
+        self.collision_cache_misses = 0
         self.dirty_collisions = True
+        self.collision_flags = None
+        self.collision_flags_padded = None
+        self.collision_flags_version = -1
+        self.collision_flags_transitions = None
+        # (tile x, tile y) -> contact_forces entry, for the tiles that have one
+        self.force_field = None
+        self.force_field_version = -1
         self.pre_rendered_unscaled_collisions = None
-        self.prus_with_objects = None
         self.pre_rendered_collisions = None
         self.transitions = (0, 0, 0, 0)
         self.flags = 0
         self.tiles = [[(0, 0, 0) for x in range(Screen.SCREEN_W)] for y in range(Screen.SCREEN_H)]
         self.objects = []
+        self.object_grid = ObjectGrid()
+        self.object_grid.listener = self.object_changed
+        # Dynamic colliders: objects that had a hitbox other than PASSABLE when added, with that hitbox compiled as their
+        # compiled_hitbox. Collision queries find the ones near them through the object grid.
+        self.colliders = set()
+        # Bumped whenever a collider is added, removed or moved
+        self.colliders_version = 0
+        # Object batch_class -> batch stepping all of this screen's objects of that class together
+        self.object_batches = {}
         self.gravity = (0, 0.15)
         self.jump_frames = 22
+        self.collision_backend = Screen.default_collision_backend
         if tile_data is not None:
             self.load_tile_data(tile_data)
 
+    @property
+    def dirty_collisions(self):
+        return self._dirty_collisions
+
+    @dirty_collisions.setter
+    def dirty_collisions(self, value):
+        if value:
+            self.collision_version += 1
+            self.collision_cache.clear()
+        self._dirty_collisions = value
+
     def _read_header_v1(self, reader):
         scrid = struct.unpack("<L", eofc_read(reader, 4))[0]
         tr_e = struct.unpack("<L", eofc_read(reader, 4))[0]
@@ -208,6 +499,7 @@ class Screen:
             self.transitions = (tile_data[0][1], tile_data[0][2], tile_data[0][3], tile_data[0][4])
             self.flags = tile_data[0][5]
             self.tiles = tile_data[1]
+        self.dirty_collisions = True
 
     def write_tile_data(self, target):
         self._write_header(target)
@@ -215,10 +507,97 @@ class Screen:
             for tile in row:
                 self._write_tile(target, tile)
 
+    # Marks the tiles from (tx0, ty0) to (tx1, ty1) inclusive to be recomposited on the next render_to_window.
+    def mark_tiles_dirty(self, tx0, ty0, tx1=None, ty1=None):
+        tx1 = tx0 if tx1 is None else tx1
+        ty1 = ty0 if ty1 is None else ty1
+        self.dirty_rects.append(pygame.Rect(tx0 * Tileset.TILE_W, ty0 * Tileset.TILE_H, (tx1 - tx0 + 1) * Tileset.TILE_W, (ty1 - ty0 + 1) * Tileset.TILE_H))
+
+    # Redraws background and tiles over area, a tile aligned rect of the unscaled surface. At any other tile size, the
+    # scaled tileset and background are composited straight into pre_rendered instead.
+    def composite_tiles(self, area, tile_w=Tileset.TILE_W, tile_h=Tileset.TILE_H):
+        tileset = self.world.tileset
+        if tile_w == Tileset.TILE_W and tile_h == Tileset.TILE_H:
+            target = self.pre_rendered_unscaled
+            background = self.background.image_surface
+            image = tileset.image_surface
+            tile_rects = tileset.tile_rects
+        else:
+            target = self.pre_rendered
+            bg_w, bg_h = self.background.image_surface.get_size()
+            background = self.background.scaled_to(bg_w * tile_w // Tileset.TILE_W, bg_h * tile_h // Tileset.TILE_H)
+            image, tile_rects = tileset.scaled_to(tile_w, tile_h)
+        tx0 = area.x // Tileset.TILE_W
+        ty0 = area.y // Tileset.TILE_H
+        tx1 = area.right // Tileset.TILE_W
+        ty1 = area.bottom // Tileset.TILE_H
+        dest = pygame.Rect(tx0 * tile_w, ty0 * tile_h, (tx1 - tx0) * tile_w, (ty1 - ty0) * tile_h)
+        target.fill(0, dest)
+        target.blit(background, dest.topleft, dest)
+        # Transparent tiles, such as the empty (0, 0), have no rect and leave the background showing
+        blits = []
+        for y in range(ty0, ty1):
+            row = self.tiles[y]
+            dest_y = y * tile_h
+            for x in range(tx0, tx1):
+                tile = row[x]
+                src = tile_rects.get((tile[0], tile[1]))
+                if src is not None:
+                    blits.append((image, (x * tile_w, dest_y), src))
+        target.blits(blits, False)
+        return dest
+
+    # The size a tile is drawn at in a win_w by win_h window when compositing from scaled assets, or None if the window
+    # is the unscaled size or does not fit a whole number of pixels per tile.
+    @staticmethod
+    def prescaled_tile_size(win_w, win_h):
+        if not Screen.render_prescaled or (win_w == Screen.SCREEN_SIZE_W and win_h == Screen.SCREEN_SIZE_H):
+            return None
+        if win_w % Screen.SCREEN_W != 0 or win_h % Screen.SCREEN_H != 0:
+            return None
+        return win_w // Screen.SCREEN_W, win_h // Screen.SCREEN_H
+
+    # Rescales only area of the unscaled surface into pre_rendered. A tile of margin around it is scaled along, so
+    # filtering at the edges of the area sees the same neighbours as in a full rescale, and the scaled region is
+    # aligned to where source and window pixels line up, so it maps the same way the full rescale does. Window pixels
+    # just outside area are filtered from pixels inside it, so the blit reaches a scale factor (rounded up) further.
+    def rescale_area(self, area, win_w, win_h):
+        if win_w == Screen.SCREEN_SIZE_W and win_h == Screen.SCREEN_SIZE_H:
+            return self.pre_rendered.blit(self.pre_rendered_unscaled, area.topleft, area)
+        sx = win_w / Screen.SCREEN_SIZE_W
+        sy = win_h / Screen.SCREEN_SIZE_H
+        step_x = Screen.SCREEN_SIZE_W // math.gcd(Screen.SCREEN_SIZE_W, win_w)
+        step_y = Screen.SCREEN_SIZE_H // math.gcd(Screen.SCREEN_SIZE_H, win_h)
+        # Upscaling does not line up on any period, so it is done over the full width or height
+        if win_w > Screen.SCREEN_SIZE_W:
+            step_x = Screen.SCREEN_SIZE_W
+        if win_h > Screen.SCREEN_SIZE_H:
+            step_y = Screen.SCREEN_SIZE_H
+        x0 = max(0, (area.x - Tileset.TILE_W) // step_x * step_x)
+        y0 = max(0, (area.y - Tileset.TILE_H) // step_y * step_y)
+        x1 = min(Screen.SCREEN_SIZE_W, -(-(area.right + Tileset.TILE_W) // step_x) * step_x)
+        y1 = min(Screen.SCREEN_SIZE_H, -(-(area.bottom + Tileset.TILE_H) // step_y) * step_y)
+        src = pygame.Rect(x0, y0, x1 - x0, y1 - y0)
+        src_x0 = x0 * win_w // Screen.SCREEN_SIZE_W
+        src_y0 = y0 * win_h // Screen.SCREEN_SIZE_H
+        scaled = pygame.transform.smoothscale(self.pre_rendered_unscaled.subsurface(src), (x1 * win_w // Screen.SCREEN_SIZE_W - src_x0, y1 * win_h // Screen.SCREEN_SIZE_H - src_y0))
+        reach_x = math.ceil(sx)
+        reach_y = math.ceil(sy)
+        dest_x0 = int(area.x * sx) - reach_x
+        dest_y0 = int(area.y * sy) - reach_y
+        inner = pygame.Rect(dest_x0 - src_x0, dest_y0 - src_y0, math.ceil(area.right * sx) + reach_x - dest_x0,
+                            math.ceil(area.bottom * sy) + reach_y - dest_y0).clip(scaled.get_rect())
+        return self.pre_rendered.blit(scaled, (src_x0 + inner.x, src_y0 + inner.y), inner)
+
+    # Returns the window rects that differ from the last time the screen was rendered.
     def render_to_window(self, wnd):
         win_w = wnd.display.get_width()
         win_h = wnd.display.get_height()
-        resizing = False
+        tile_size = Screen.prescaled_tile_size(win_w, win_h)
+        if tile_size is not None:
+            return self.render_prescaled_to_window(wnd, tile_size)
+        changed = []
+        resizing = self.pre_rendered_tile_size is not None
         if self.pre_rendered is not None:
             pr_w = self.pre_rendered.get_width()
             pr_h = self.pre_rendered.get_height()
@@ -230,83 +609,472 @@ class Screen:
         if self.dirty or self.pre_rendered_unscaled is None:
             if self.pre_rendered_unscaled is None:
                 self.pre_rendered_unscaled = pygame.Surface((Screen.SCREEN_SIZE_W, Screen.SCREEN_SIZE_H))
-            self.pre_rendered_unscaled.fill(0)
-            self.pre_rendered_unscaled.blit(self.background.image_surface, (0, 0))
-            for y in range(Screen.SCREEN_H):
-                for x in range(Screen.SCREEN_W):
-                    tile = self.tiles[y][x]
-                    src_x = tile[0] * Tileset.TILE_W
-                    src_y = tile[1] * Tileset.TILE_H
-                    dest_x = x * Tileset.TILE_W
-                    dest_y = y * Tileset.TILE_H
-                    self.pre_rendered_unscaled.blit(self.world.tileset.image_surface, (dest_x, dest_y), pygame.Rect(src_x, src_y, Tileset.TILE_W, Tileset.TILE_H))
+            self.composite_tiles(self.pre_rendered_unscaled.get_rect())
             self.dirty = False
+            self.dirty_rects = []
             resizing = True
+        elif self.dirty_rects:
+            # rescale_area upscales over the whole screen anyway, so a single rescale covers every area
+            if win_w > Screen.SCREEN_SIZE_W and win_h > Screen.SCREEN_SIZE_H:
+                resizing = True
+            for area in self.dirty_rects:
+                self.composite_tiles(area)
+                if not resizing and self.pre_rendered is not None:
+                    changed.append(self.rescale_area(area, win_w, win_h))
+            self.dirty_rects = []
         if resizing or self.pre_rendered is None:
             self.pre_rendered = pygame.Surface((win_w, win_h))
+            self.pre_rendered_tile_size = None
             pygame.transform.smoothscale(self.pre_rendered_unscaled, (win_w, win_h), self.pre_rendered)
+            changed = [self.pre_rendered.get_rect()]
         wnd.display.blit(self.pre_rendered, (0, 0))
+        return changed
+
+    # Composites straight at the window's size; nothing is scaled per frame or per change.
+    def render_prescaled_to_window(self, wnd, tile_size):
+        changed = []
+        if self.dirty or self.pre_rendered is None or self.pre_rendered_tile_size != tile_size:
+            self.pre_rendered = pygame.Surface(wnd.display.get_size())
+            self.pre_rendered_tile_size = tile_size
+            self.composite_tiles(pygame.Rect(0, 0, Screen.SCREEN_SIZE_W, Screen.SCREEN_SIZE_H), *tile_size)
+            self.dirty = False
+            # The unscaled surface did not see these changes
+            self.pre_rendered_unscaled = None
+            changed = [self.pre_rendered.get_rect()]
+        elif self.dirty_rects:
+            for area in self.dirty_rects:
+                changed.append(self.composite_tiles(area, *tile_size))
+            self.pre_rendered_unscaled = None
+        self.dirty_rects = []
+        wnd.display.blit(self.pre_rendered, (0, 0))
+        return changed
+
+    def add_object(self, obj):
+        self.objects.append(obj)
+        self.object_grid.insert(obj)
+        if obj.hitbox is not None and obj.hitbox_type != CollisionTest.PASSABLE:
+            obj.compiled_hitbox = compile_hitbox(obj.hitbox)
+            self.colliders.add(obj)
+        if obj.batch_class is not None:
+            batch = self.object_batches.get(obj.batch_class)
+            if batch is None:
+                batch = obj.batch_class()
+                self.object_batches[obj.batch_class] = batch
+            batch.add(obj)
+
+    def remove_object(self, obj):
+        self.objects.remove(obj)
+        self.object_grid.remove(obj)
+        self.colliders.discard(obj)
+        if obj.batch_class is not None:
+            self.object_batches[obj.batch_class].remove(obj)
+
+    # Objects that collide invalidate every cached query whose area they leave or enter.
+    def object_changed(self, obj, old_bounds, new_bounds):
+        if obj.hitbox is None or obj.hitbox_type == CollisionTest.PASSABLE:
+            return
+        self.colliders_version += 1
+        if not self.collision_cache:
+            return
+        stale = [key for key, (rect, result) in self.collision_cache.items() if (old_bounds is not None and rect.colliderect(old_bounds)) or (new_bounds is not None and rect.colliderect(new_bounds))]
+        for key in stale:
+            del self.collision_cache[key]
+
+    def colliders_in_rect(self, rect):
+        if not self.colliders:
+            return []
+        return [obj for obj in self.object_grid.query_rect(rect) if obj in self.colliders]
+
+    # Flags of the given colliders' hitboxes over an area, as collision_window has them for the tiles.
+    def collider_window(self, x, y, w, h, colliders):
+        stamp = numpy.zeros((h, w), dtype=numpy.uint16)
+        for obj in colliders:
+            hitbox = obj.compiled_hitbox
+            ox = int(obj.x)
+            oy = int(obj.y)
+            x0 = max(x, ox)
+            y0 = max(y, oy)
+            x1 = min(x + w, ox + hitbox.width)
+            y1 = min(y + h, oy + hitbox.height)
+            if x0 < x1 and y0 < y1:
+                stamp[y0 - y:y1 - y, x0 - x:x1 - x][hitbox.mask[y0 - oy:y1 - oy, x0 - ox:x1 - ox]] |= int(obj.hitbox_type)
+        return stamp
+
+    def objects_in_rect(self, rect):
+        return self.object_grid.query_rect(rect)
+
+    def objects_near(self, x, y, radius):
+        return self.object_grid.query_near(x, y, radius)
+
+    # The scale objects are drawn at in wnd, or None where the screen is composited unscaled.
+    @staticmethod
+    def object_scale(wnd):
+        win_w, win_h = wnd.display.get_size()
+        if Screen.prescaled_tile_size(win_w, win_h) is None:
+            return None
+        return win_w / Screen.SCREEN_SIZE_W, win_h / Screen.SCREEN_SIZE_H
 
-    def render_objects(self, wnd):
-        for obj in self.objects:
-            obj.draw(wnd)
+    @staticmethod
+    def scale_rect(rect, scale):
+        return pygame.Rect(int(rect.x * scale[0]), int(rect.y * scale[1]), math.ceil(rect.w * scale[0]) + 1, math.ceil(rect.h * scale[1]) + 1)
 
-    def render_objects_hitboxes(self, wnd):
-        for obj in self.objects:
-            obj.draw_as_hitbox(wnd, (0, 255, 0))
+    # Both return the window rects drawn over.
+    def render_objects(self, wnd, area=None):
+        scale = Screen.object_scale(wnd)
+        drawn = []
+        for obj in (self.objects if area is None else self.object_grid.query_rect(area)):
+            obj.draw(wnd, scale)
+            rect = obj.drawn_rect()
+            drawn.append(rect if scale is None else Screen.scale_rect(rect, scale))
+        return drawn
+
+    def render_objects_hitboxes(self, wnd, area=None):
+        scale = Screen.object_scale(wnd)
+        drawn = []
+        for obj in (self.objects if area is None else self.object_grid.query_rect(area)):
+            obj.draw_as_hitbox(wnd, (0, 255, 0), scale)
+            rect = obj.drawn_rect()
+            drawn.append(rect if scale is None else Screen.scale_rect(rect, scale))
+        return drawn
+
+    # The Collision of every tile: [y][x]
+    def tile_collision_ids(self):
+        return numpy.array([[tile[2] for tile in row] for row in self.tiles], dtype=numpy.intp)
 
     def ensure_unscaled_collisions(self):
         if self.dirty_collisions or self.pre_rendered_unscaled_collisions is None:
             if self.pre_rendered_unscaled_collisions is None:
                 self.pre_rendered_unscaled_collisions = pygame.Surface((Screen.SCREEN_SIZE_W, Screen.SCREEN_SIZE_H))
-            self.pre_rendered_unscaled_collisions.fill((255, 255, 255))
-            for y in range(Screen.SCREEN_H):
-                for x in range(Screen.SCREEN_W):
-                    tile = self.tiles[y][x]
-                    dest_x = x * Tileset.TILE_W
-                    dest_y = y * Tileset.TILE_H
-                    Screen.collision_overlays[Collision(tile[2])](self.pre_rendered_unscaled_collisions, dest_x, dest_y)
+            Screen.build_collision_shapes()
+            if Screen.collision_stamps_mapped is None:
+                stamps = Screen.collision_stamps.transpose(0, 2, 1, 3)
+                mapped = pygame.surfarray.map_array(self.pre_rendered_unscaled_collisions, stamps.reshape(-1, Tileset.TILE_H, 3))
+                Screen.collision_stamps_mapped = mapped.reshape(stamps.shape[:3])
+            # (tile x, tile y, pixel x, pixel y) -> surfarray's (x, y)
+            stamped = Screen.collision_stamps_mapped[self.tile_collision_ids().T].transpose(0, 2, 1, 3)
+            pygame.surfarray.blit_array(self.pre_rendered_unscaled_collisions, stamped.reshape(Screen.SCREEN_SIZE_W, Screen.SCREEN_SIZE_H))
             self.dirty_collisions = False
             return True
         return False
 
-    def generate_object_collisions(self):
-        self.ensure_unscaled_collisions()
-        self.prus_with_objects = self.pre_rendered_unscaled_collisions.copy()
-        for obj in self.objects:
-            if obj.hitbox_type in COLLISIONTEST_COLORS:
-                obj.draw_as_hitbox(self.prus_with_objects, Screen.collision_overlays[obj.hitbox_type])
+    def ensure_collision_flags(self):
+        pad = Screen.collision_flags_padding
+        if self.collision_flags_padded is None or self.collision_flags_version != self.collision_version:
+            Screen.build_collision_shapes()
+            if self.collision_flags_padded is None:
+                self.collision_flags_padded = numpy.zeros((Screen.SCREEN_SIZE_H + 2 * pad, Screen.SCREEN_SIZE_W + 2 * pad), dtype=numpy.uint16)
+                self.collision_flags = self.collision_flags_padded[pad:-pad, pad:-pad]
+                self.collision_flags_transitions = None
+            ids = self.tile_collision_ids()
+            # (tile y, tile x, pixel y, pixel x) -> (y, x)
+            stamped = Screen.collision_shapes_array[ids].transpose(0, 2, 1, 3)
+            self.collision_flags[:] = stamped.reshape(Screen.SCREEN_SIZE_H, Screen.SCREEN_SIZE_W)
+            self.collision_flags_version = self.collision_version
+        if self.collision_flags_transitions != self.transitions:
+            # Out of bounds is resolved west, north, east, south in that order, so paint in reverse.
+            padded = self.collision_flags_padded
+            padded[pad + Screen.SCREEN_SIZE_H:, :] = CollisionTest.TRANSITION_SOUTH if self.transitions[3] else CollisionTest.SOLID
+            padded[:, pad + Screen.SCREEN_SIZE_W:] = CollisionTest.TRANSITION_EAST if self.transitions[0] else CollisionTest.SOLID
+            padded[:pad, :] = CollisionTest.TRANSITION_NORTH if self.transitions[1] else CollisionTest.SOLID
+            padded[:, :pad] = CollisionTest.TRANSITION_WEST if self.transitions[2] else CollisionTest.SOLID
+            self.collision_flags_transitions = self.transitions
+        return self.collision_flags
+
+    def ensure_force_field(self):
+        if self.force_field is None or self.force_field_version != self.collision_version:
+            self.force_field = {}
+            for ty, row in enumerate(self.tiles):
+                for tx, tile in enumerate(row):
+                    forces = Screen.contact_forces.get(tile[2])
+                    if forces is not None:
+                        self.force_field[(tx, ty)] = forces
+            self.force_field_version = self.collision_version
+        return self.force_field
+
+    # Distinct forces of the tiles the hitbox at (x, y) touches from each side, in probe order.
+    def contact_forces_at(self, x, y, hitbox):
+        field = self.ensure_force_field()
+        if not field:
+            return ()
+        hitbox = compile_hitbox(hitbox)
+        found = []
+        for cxo, cyo, idx in COLLISION_PROBES:
+            tx0 = (x + cxo) // Tileset.TILE_W
+            tx1 = (x + cxo + hitbox.width - 1) // Tileset.TILE_W
+            ty0 = (y + cyo) // Tileset.TILE_H
+            ty1 = (y + cyo + hitbox.height - 1) // Tileset.TILE_H
+            for ty in range(ty0, ty1 + 1):
+                for tx in range(tx0, tx1 + 1):
+                    forces = field.get((tx, ty))
+                    if forces is not None:
+                        force = forces.get(idx)
+                        if force is not None and force not in found:
+                            found.append(force)
+        return found
+
+    def collision_window(self, x, y, w, h):
+        self.ensure_collision_flags()
+        pad = Screen.collision_flags_padding
+        padded = self.collision_flags_padded
+        px = x + pad
+        py = y + pad
+        if px >= 0 and py >= 0 and px + w <= padded.shape[1] and py + h <= padded.shape[0]:
+            return padded[py:py + h, px:px + w]
+        # Beyond the padding every out of bounds region simply continues outwards.
+        rows = numpy.clip(numpy.arange(py, py + h), 0, padded.shape[0] - 1)
+        cols = numpy.clip(numpy.arange(px, px + w), 0, padded.shape[1] - 1)
+        return padded[numpy.ix_(rows, cols)]
+
+    # Tiles and colliders alike, as every collision query sees them.
+    def collision_area_flags(self, x, y, w, h):
+        flags = int(numpy.bitwise_or.reduce(self.collision_window(x, y, w, h), axis=None))
+        colliders = self.colliders_in_rect(pygame.Rect(x, y, w, h))
+        if colliders:
+            flags |= int(numpy.bitwise_or.reduce(self.collider_window(x, y, w, h, colliders), axis=None))
+        return flags
 
     def access_collision(self):
         self.ensure_unscaled_collisions()
         return pygame.PixelArray(self.pre_rendered_unscaled_collisions)
 
+    def collision_flag_at(self, x, y):
+        if x < 0:
+            return CollisionTest.TRANSITION_WEST if self.transitions[2] else CollisionTest.SOLID
+        elif y < 0:
+            return CollisionTest.TRANSITION_NORTH if self.transitions[1] else CollisionTest.SOLID
+        elif x >= Screen.SCREEN_SIZE_W:
+            return CollisionTest.TRANSITION_EAST if self.transitions[0] else CollisionTest.SOLID
+        elif y >= Screen.SCREEN_SIZE_H:
+            return CollisionTest.TRANSITION_SOUTH if self.transitions[3] else CollisionTest.SOLID
+        shape = Screen.build_collision_shapes()[self.tiles[y // Tileset.TILE_H][x // Tileset.TILE_W][2]]
+        return shape[y % Tileset.TILE_H][x % Tileset.TILE_W]
+
+    # First and last row in [y0, y1) of column x whose pixel prevents movement, or None if there is none.
+    def column_blocking(self, x, y0, y1):
+        if y0 >= y1:
+            return None
+        blocking = self._column_blocking_tiles(x, y0, y1)
+        for obj in self.colliders_in_rect(pygame.Rect(x, y0, 1, y1 - y0)):
+            if not obj.hitbox_type & COLLISIONTEST_PREVENTS_MOVEMENT:
+                continue
+            hitbox = obj.compiled_hitbox
+            ox = int(obj.x)
+            oy = int(obj.y)
+            if not 0 <= x - ox < hitbox.width:
+                continue
+            rows = numpy.flatnonzero(hitbox.mask[max(0, y0 - oy):max(0, y1 - oy), x - ox])
+            if len(rows):
+                first = int(rows[0]) + max(0, y0 - oy) + oy
+                last = int(rows[-1]) + max(0, y0 - oy) + oy
+                blocking = (first, last) if blocking is None else (min(blocking[0], first), max(blocking[1], last))
+        return blocking
+
+    # column_blocking over the tiles alone. Walks the per tile profiles, so the cost is per tile spanned rather than
+    # per pixel.
+    def _column_blocking_tiles(self, x, y0, y1):
+        if x < 0:
+            return None if self.transitions[2] else (y0, y1 - 1)
+        first = None
+        last = None
+        if y0 < 0:
+            if not self.transitions[1]:
+                first = y0
+                last = min(y1, 0) - 1
+            y0 = 0
+        if x >= Screen.SCREEN_SIZE_W:
+            if y0 < y1 and not self.transitions[0]:
+                return (y0 if first is None else first, y1 - 1)
+            return None if first is None else (first, last)
+        Screen.build_collision_shapes()
+        tx = x // Tileset.TILE_W
+        sx = x % Tileset.TILE_W
+        y = y0
+        while y < min(y1, Screen.SCREEN_SIZE_H):
+            ty = y // Tileset.TILE_H
+            top = ty * Tileset.TILE_H
+            end = min(y1, top + Tileset.TILE_H)
+            profile = Screen.collision_profiles[self.tiles[ty][tx][2]]
+            if profile is not None:
+                for start, stop in profile[sx]:
+                    start = max(start + top, y)
+                    stop = min(stop + top, end)
+                    if start < stop:
+                        if first is None:
+                            first = start
+                        last = stop - 1
+            y = end
+        if y1 > Screen.SCREEN_SIZE_H and not self.transitions[3]:
+            if first is None:
+                first = max(y0, Screen.SCREEN_SIZE_H)
+            last = y1 - 1
+        return None if first is None else (first, last)
+
+    def collision_row(self, y, x0, x1):
+        if y < 0 or y >= Screen.SCREEN_SIZE_H or x0 < 0 or x1 > Screen.SCREEN_SIZE_W:
+            return [self.collision_flag_at(x, y) for x in range(x0, x1)]
+        shapes = Screen.build_collision_shapes()
+        tile_row = self.tiles[y // Tileset.TILE_H]
+        sy = y % Tileset.TILE_H
+        row = []
+        x = x0
+        while x < x1:
+            tx = x // Tileset.TILE_W
+            end = min(x1, (tx + 1) * Tileset.TILE_W)
+            sx = tx * Tileset.TILE_W
+            row.extend(shapes[tile_row[tx][2]][sy][x - sx:end - sx])
+            x = end
+        return row
+
     # coll: (flags, solid count, solid min yo, solid max yo) [E, N, W, S, overlap]
-    def test_screen_collision(self, x, y, hitbox):
-        h = len(hitbox)
-        w = len(hitbox[0])
-        coll = [(0, 0, -1, -1), (0, 0, -1, -1), (0, 0, -1, -1), (0, 0, -1, -1), (0, 0, -1, -1)]
-        cap = COLLISIONTEST_ALL_FLAGS
+    # Pass a CollisionResult as result to have it filled in place instead of allocating a new one.
+    def test_screen_collision(self, x, y, hitbox, result=None):
+        if result is None:
+            result = CollisionResult()
+        if Screen.collision_cache_size:
+            hitbox = compile_hitbox(hitbox)
+            if self.collision_cache_transitions != self.transitions:
+                self.collision_cache.clear()
+                self.collision_cache_transitions = self.transitions
+            key = (self.collision_version, x, y, id(hitbox))
+            cached = self.collision_cache.get(key)
+            if cached is not None:
+                self.collision_cache.move_to_end(key)
+                self.collision_cache_hits += 1
+                return result.copy_from(cached[1])
+            self.collision_cache_misses += 1
+            self._test_screen_collision_uncached(x, y, hitbox, result.reset())
+            self.collision_cache[key] = (pygame.Rect(x - 1, y - 1, hitbox.width + 2, hitbox.height + 2), CollisionResult().copy_from(result))
+            if len(self.collision_cache) > Screen.collision_cache_size:
+                self.collision_cache.popitem(last=False)
+            return result
+        return self._test_screen_collision_uncached(x, y, hitbox, result.reset())
+
+    def _test_screen_collision_uncached(self, x, y, hitbox, result):
+        hitbox = compile_hitbox(hitbox)
+        colliders = self.colliders_in_rect(pygame.Rect(x - 1, y - 1, hitbox.width + 2, hitbox.height + 2))
+        # The tile and surface backends only know tiles; with colliders around, the flag arrays take both.
+        if self.collision_backend == CollisionBackend.FLAGS or colliders:
+            self._test_screen_collision_flags(x, y, hitbox, result, colliders)
+        elif self.collision_backend == CollisionBackend.TILES:
+            self._test_screen_collision_tiles(x, y, hitbox, result)
+        else:
+            self._test_screen_collision_surface(x, y, hitbox, result)
+        return result
+
+    def _test_screen_collision_flags(self, x, y, hitbox, result, colliders=None):
+        mask = compile_hitbox(hitbox).mask
+        h, w = mask.shape
+        window = self.collision_window(x - 1, y - 1, w + 2, h + 2)
+        if colliders is None:
+            colliders = self.colliders_in_rect(pygame.Rect(x - 1, y - 1, w + 2, h + 2))
+        if colliders:
+            window = window | self.collider_window(x - 1, y - 1, w + 2, h + 2, colliders)
+        # (point, probe, yo, xo), probes in result order
+        probes = numpy.stack([window[1 + cyo:1 + cyo + h, 1 + cxo:1 + cxo + w] for cxo, cyo, idx in COLLISION_PROBES])
+        Screen._reduce_collision_probes(numpy.where(mask, probes[None], 0), (result,))
+
+    # results: optional list of CollisionResult to reuse; it is grown to len(points) and filled in place.
+    def test_screen_collision_batch(self, points, hitbox, results=None):
+        if results is None:
+            results = []
+        while len(results) < len(points):
+            results.append(CollisionResult())
+        if self.collision_backend != CollisionBackend.FLAGS or len(points) < 2:
+            for (x, y), result in zip(points, results):
+                self.test_screen_collision(x, y, hitbox, result)
+            return results[:len(points)]
+        mask = compile_hitbox(hitbox).mask
+        h, w = mask.shape
+        xs = numpy.array([pt[0] for pt in points])
+        ys = numpy.array([pt[1] for pt in points])
+        x0 = int(xs.min()) - 1
+        y0 = int(ys.min()) - 1
+        ww = int(xs.max()) + w + 1 - x0
+        wh = int(ys.max()) + h + 1 - y0
+        window = self.collision_window(x0, y0, ww, wh)
+        colliders = self.colliders_in_rect(pygame.Rect(x0, y0, ww, wh))
+        if colliders:
+            window = window | self.collider_window(x0, y0, ww, wh, colliders)
+        rows = (ys - 1 - y0)[:, None] + numpy.arange(h + 2)
+        cols = (xs - 1 - x0)[:, None] + numpy.arange(w + 2)
+        areas = window[rows[:, :, None], cols[:, None, :]]
+        probes = numpy.stack([areas[:, 1 + cyo:1 + cyo + h, 1 + cxo:1 + cxo + w] for cxo, cyo, idx in COLLISION_PROBES], axis=1)
+        Screen._reduce_collision_probes(numpy.where(mask, probes, 0), results)
+        return results[:len(points)]
+
+    @staticmethod
+    def _reduce_collision_probes(probes, results):
+        count, probe_count, h = probes.shape[:3]
+        flags = numpy.bitwise_or.reduce(probes.reshape(count, probe_count, -1), axis=2)
+        blocking = (probes & COLLISIONTEST_PREVENTS_MOVEMENT) != 0
+        counts = numpy.count_nonzero(blocking, axis=(2, 3))
+        blocking_rows = blocking.any(axis=3)
+        min_rows = blocking_rows.argmax(axis=2).tolist()
+        max_rows = (h - 1 - blocking_rows[:, :, ::-1].argmax(axis=2)).tolist()
+        flags = flags.tolist()
+        counts = counts.tolist()
+        for i in range(count):
+            coll = results[i]
+            for cxo, cyo, idx in COLLISION_PROBES:
+                if counts[i][idx]:
+                    min_row = min_rows[i][idx]
+                    min_yo = min_row + cyo
+                    if min_yo == -1 and blocking_rows[i, idx, min_row + 1:].any():
+                        # -1 doubles as "no blocking row yet", so the next blocking row replaces it.
+                        min_yo = int(blocking_rows[i, idx, min_row + 1:].argmax()) + min_row + 1 + cyo
+                    coll[idx].set(flags[i][idx], counts[i][idx], min_yo, max_rows[i][idx] + cyo)
+                else:
+                    coll[idx].set(flags[i][idx], 0, -1, -1)
+
+    def _test_screen_collision_tiles(self, x, y, hitbox, coll):
+        hitbox = compile_hitbox(hitbox)
+        h = hitbox.height
+        w = hitbox.width
+        # Flags of the hitbox area plus a one pixel border, so every probe is a plain lookup.
+        window = [self.collision_row(cy, x - 1, x + w + 1) for cy in range(y - 1, y + h + 1)]
+        for cxo, cyo, idx in COLLISION_PROBES:
+            flags = 0
+            cnt = 0
+            min_yo = -1
+            max_yo = -1
+            for yo, spans in enumerate(hitbox.spans):
+                row = window[yo + cyo + 1]
+                if not any(row):
+                    continue
+                for start, end in spans:
+                    for flag in row[cxo + 1 + start:cxo + 1 + end]:
+                        if flag:
+                            flags |= flag
+                            if flag & COLLISIONTEST_PREVENTS_MOVEMENT:
+                                cnt += 1
+                                if min_yo == -1:
+                                    min_yo = yo + cyo
+                                max_yo = yo + cyo
+            coll[idx].set(flags, cnt, min_yo, max_yo)
+
+    def _test_screen_collision_surface(self, x, y, hitbox, coll):
+        hitbox = compile_hitbox(hitbox)
         with self.access_collision() as pixels:
-            for yo in range(h):
+            for yo, spans in enumerate(hitbox.spans):
                 cy = y + yo
-                for xo in range(w):
-                    if hitbox[yo][xo]:
+                for start, end in spans:
+                    for xo in range(start, end):
                         cx = x + xo
-                        sat = 0
-                        for cxo, cyo, idx in [(1, 0, 0), (0, -1, 1), (-1, 0, 2), (0, 1, 3), (0, 0, 4)]:
+                        for cxo, cyo, idx in COLLISION_PROBES:
+                            probe = coll[idx]
                             try:
                                 if cx + cxo < 0 or cy + cyo < 0:
                                     raise IndexError
                                 px = pixels[cx + cxo, cy + cyo]
                                 if px in Screen.collision_test_flags:
                                     flag = Screen.collision_test_flags[px]
-                                    coll[idx] = (coll[idx][0] | Screen.collision_test_flags[px], coll[idx][1], coll[idx][2], coll[idx][3])
+                                    probe.flags |= flag
                                     if flag & COLLISIONTEST_PREVENTS_MOVEMENT:
-                                        cnt = coll[idx][1] + 1
-                                        min_yo = yo + cyo if coll[idx][2] == -1 or coll[idx][2] > yo + cyo else coll[idx][2]
-                                        max_yo = yo + cyo if coll[idx][3] == -1 or coll[idx][3] < yo + cyo else coll[idx][3]
-                                        coll[idx] = (coll[idx][0], cnt, min_yo, max_yo)
+                                        probe.count += 1
+                                        if probe.min_yo == -1 or probe.min_yo > yo + cyo:
+                                            probe.min_yo = yo + cyo
+                                        if probe.max_yo == -1 or probe.max_yo < yo + cyo:
+                                            probe.max_yo = yo + cyo
                             except IndexError:
                                 flag = 0
                                 if cx + cxo < 0:
@@ -329,20 +1097,13 @@ class Screen:
                                         flag |= CollisionTest.TRANSITION_SOUTH
                                     else:
                                         flag |= CollisionTest.SOLID
-                                coll[idx] = (coll[idx][0] | flag, coll[idx][1], coll[idx][2], coll[idx][3])
+                                probe.flags |= flag
                                 if flag & CollisionTest.SOLID:
-                                    cnt = coll[idx][1] + 1
-                                    min_yo = yo + cyo if coll[idx][2] == -1 or coll[idx][2] > yo + cyo else coll[idx][2]
-                                    max_yo = yo + cyo if coll[idx][3] == -1 or coll[idx][3] < yo + cyo else coll[idx][3]
-                                    coll[idx] = (coll[idx][0], cnt, min_yo, max_yo)
-
-                            if coll[idx] == cap:
-                                sat += 1
-                        if sat == len(coll):
-                            break
-                if sat == len(coll):
-                    break
-        return coll
+                                    probe.count += 1
+                                    if probe.min_yo == -1 or probe.min_yo > yo + cyo:
+                                        probe.min_yo = yo + cyo
+                                    if probe.max_yo == -1 or probe.max_yo < yo + cyo:
+                                        probe.max_yo = yo + cyo
 
     def render_collisions_to_window(self, wnd):
         win_w = wnd.display.get_width()
@@ -359,6 +1120,10 @@ class Screen:
         resizing = self.ensure_unscaled_collisions() or resizing
         if resizing or self.pre_rendered_collisions is None:
             self.pre_rendered_collisions = pygame.Surface((win_w, win_h))
-            pygame.transform.smoothscale(self.pre_rendered_unscaled_collisions, (win_w, win_h), self.pre_rendered_collisions)
+            scale_surface(self.pre_rendered_unscaled_collisions, (win_w, win_h), self.pre_rendered_collisions)
             self.pre_rendered_collisions.set_alpha(128)
+            changed = [self.pre_rendered_collisions.get_rect()]
+        else:
+            changed = []
         wnd.display.blit(self.pre_rendered_collisions, (0, 0))
+        return changed
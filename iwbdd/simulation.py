@@ -0,0 +1,704 @@
+from .world import World
+from .player import Player
+from .screen import CollisionTest, COLLISIONTEST_PREVENTS_MOVEMENT, COLLISIONTEST_TRANSITIONS, Screen, CollisionResult
+from .hitbox import compile_hitbox
+from .snapshot import Snapshot, PLAYER_FORMAT
+from enum import IntEnum
+import pygame
+
+
+def bound(v, m0, m1):
+    if v < m1:
+        if v < m0:
+            return m0
+        return v
+    return m1
+
+
+class Controls(IntEnum):
+    LEFT = 0
+    RIGHT = 1
+    JUMP = 2
+    SHOOT = 3
+
+
+class MovementResolver(IntEnum):
+    STEPPED = 0
+    SWEPT = 1
+
+
+# Controls held during one frame, as a bitmask over Controls.
+class InputState:
+    __slots__ = ("held",)
+
+    def __init__(self, held=0):
+        self.held = held
+
+    @staticmethod
+    def of(*controls):
+        state = InputState()
+        for control in controls:
+            state.set(control, True)
+        return state
+
+    def set(self, control, value):
+        if value:
+            self.held |= 1 << control
+        else:
+            self.held &= ~(1 << control)
+
+    def __getitem__(self, control):
+        return (self.held >> control) & 1 == 1
+
+    def __eq__(self, other):
+        return isinstance(other, InputState) and self.held == other.held
+
+    def __repr__(self):
+        return "InputState({0})".format(", ".join(control.name for control in Controls if self[control]))
+
+
+# Plays back a list of held bitmasks, one per frame; nothing is held once it runs out.
+class ScriptedInputProvider:
+    def __init__(self, frames):
+        self.frames = frames
+        self.position = 0
+        self.state = InputState()
+
+    def poll(self):
+        self.state.held = self.frames[self.position] if self.position < len(self.frames) else 0
+        self.position += 1
+        return self.state
+
+
+# One pixel step at a time along the movement vector, x or y first depending on which boundary is crossed first.
+class Movement:
+    def __init__(self, x, y, sumv, dest, prevent_x, prevent_y, sloping):
+        self.cx = x
+        self.cy = y
+        self.acc_tx = 0
+        self.acc_ty = 0
+        self.sumv = sumv
+        self.sgnx = -1 if sumv[0] < 0 else 1
+        self.sgny = -1 if sumv[1] < 0 else 1
+        self.dest = dest
+        self.prevent_x = prevent_x
+        self.prevent_y = prevent_y
+        self.sloping = sloping
+
+    def copy(self):
+        ret = Movement(self.cx, self.cy, self.sumv, list(self.dest), self.prevent_x, self.prevent_y, self.sloping)
+        ret.acc_tx = self.acc_tx
+        ret.acc_ty = self.acc_ty
+        return ret
+
+    def constraints(self):
+        return (self.prevent_x, self.prevent_y, self.sloping)
+
+    def advance(self):
+        nx = int(self.cx) + self.sgnx
+        ny = int(self.cy) + self.sgny
+        if self.sumv[0] and not self.prevent_x:
+            nxt = self.acc_tx + (nx - self.cx) / self.sumv[0]
+        else:
+            nxt = 2
+        if self.sumv[1] and not self.prevent_y:
+            nyt = self.acc_ty + (ny - self.cy) / self.sumv[1]
+        else:
+            nyt = 2
+        if (nxt > 1 or self.prevent_x) and (nyt > 1 or self.prevent_y):
+            return None
+        elif nxt <= nyt and not self.prevent_x:
+            if self.sloping:
+                self.cy += self.sloping
+                self.dest[1] += self.sloping
+            pt = (nx, int(self.cy))
+            self.cx = nx
+            self.acc_tx = nxt
+        elif not self.prevent_y:
+            pt = (int(self.cx), ny)
+            self.cy = ny
+            self.acc_ty = nyt
+        else:
+            return None
+        return pt
+
+    # Sloping for a step in x from (x, y) that the directional probe says is blocked, or None if the step is blocked.
+    # Only the column the hitbox moves into is looked at, through the screen's per tile height profiles: a single
+    # blocking pixel at foot height is a rise to walk up, one at head height a ceiling slope to slide down along.
+    def slope_ahead(self, screen, x, y, hitbox, bottom_pixel, coll):
+        ahead = x + hitbox.width if self.sgnx > 0 else x - 1
+        span = screen.column_blocking(ahead, y, y + hitbox.height)
+        if span is None:
+            return 0
+        if span[0] == span[1] == y + bottom_pixel and not coll[1].flags & COLLISIONTEST_PREVENTS_MOVEMENT:
+            return -1
+        if span[0] == span[1] == y and not coll[3].flags & COLLISIONTEST_PREVENTS_MOVEMENT:
+            return 1
+        return None
+
+    # Returns False if the step ran into something deadly.
+    def resolve(self, screen, pt, coll, hitbox, bottom_pixel):
+        overlap = coll[4].flags
+        if overlap & CollisionTest.DEADLY:
+            return False
+        xdir = coll[2 if self.sgnx < 0 else 0]
+        ydir = coll[1 if self.sgny < 0 else 3]
+        if not self.prevent_y and ydir.flags & COLLISIONTEST_PREVENTS_MOVEMENT:
+            self.prevent_y = True
+            self.dest[1] = pt[1]
+        if not self.prevent_x and xdir.flags & COLLISIONTEST_PREVENTS_MOVEMENT:
+            sloping = self.slope_ahead(screen, pt[0], pt[1], hitbox, bottom_pixel, coll)
+            if sloping is None:
+                self.prevent_x = True
+                self.dest[0] = pt[0]
+                self.sloping = 0
+            else:
+                self.sloping = sloping
+        else:
+            self.sloping = 0
+        return True
+
+
+# Headless physics core: the worlds, the player and one frame of movement per step(). Nothing here needs a
+# window, the event queue or a main loop, so it can be stepped as fast as the collision queries allow.
+class Simulation:
+    # terminal_velocity = 4.4
+    terminal_velocity = 3.3
+    doublejump_strength = 0.8
+    movement_speed = 1.5
+    default_movement_resolver = MovementResolver.SWEPT
+    # Also tick the objects of the screens the active screen transitions to, instead of letting them sleep
+    default_tick_adjacent_screens = False
+
+    def __init__(self):
+        self.worlds = []
+        self.current_world = None
+        self.current_screen = None
+        self.movement_resolver = Simulation.default_movement_resolver
+        # Collision results reused by the movement resolvers across sub-steps
+        self.step_collision = CollisionResult()
+        self.sweep_collisions = []
+        self.frame = 0
+        self.death_frame = None
+        self.tick_adjacent_screens = Simulation.default_tick_adjacent_screens
+        # Screen ID -> last frame its objects were ticked on; screens missing from it have slept since frame 0
+        self.ticked_frames = {}
+        # Screens ticked on the last frame. Every other screen that has been awake since rest_objects has its objects'
+        # packed states ((object, packed state), ...) from when it fell asleep in resting_objects, or from before it first
+        # woke in pristine_objects. Snapshots pack only the awake screens and share resting_objects, which is replaced
+        # rather than changed in place.
+        self.awake_screens = []
+        self.resting_objects = {}
+        self.pristine_objects = {}
+
+        self.player = None
+
+    def add_loaded_world(self, world):
+        self.worlds.append(world)
+        if self.current_world is None:
+            self.current_world = world
+            self.current_screen = self.current_world.screens[self.current_world.starting_screen_id]
+            if self.player is not None:
+                self.player.x = self.current_world.start_x
+                self.player.y = self.current_world.start_y
+                self.current_screen.add_object(self.player)
+                self.player.screen = self.current_screen
+
+    def load_world_from_file(self, world):
+        loaded_world = World(world)
+        self.worlds.append(loaded_world)
+        if self.current_world is None:
+            self.current_world = loaded_world
+            self.current_screen = self.current_world.screens[self.current_world.starting_screen_id]
+            if self.player is not None:
+                self.player.x = self.current_world.start_x
+                self.player.y = self.current_world.start_y
+                self.current_screen.add_object(self.player)
+                self.player.screen = self.current_screen
+
+    def create_player(self):
+        if self.player is None:
+            self.player = Player()
+            if self.current_world is not None:
+                self.player.x = self.current_world.start_x
+                self.player.y = self.current_world.start_y
+                self.current_screen.add_object(self.player)
+            self.player.screen = self.current_screen
+
+    # Puts a freshly reset player at (x, y) on a screen of the current world and restarts the frame count.
+    def place_player(self, screen_id, x, y):
+        self.player.reset()
+        if self.current_screen is not None and self.player in self.current_screen.objects:
+            self.current_screen.remove_object(self.player)
+        self.current_screen = self.current_world.screens[screen_id]
+        self.player.screen = self.current_screen
+        self.player.x = x
+        self.player.y = y
+        self.current_screen.add_object(self.player)
+        self.frame = 0
+        self.death_frame = None
+        self.ticked_frames = {}
+        self.rest_objects()
+
+    # Everything step() carries from one frame to the next: (screen id, x, y, gravity velocity, double jumps available,
+    # jump held, jumping, dead, animation state, frame, death frame)
+    def save_state(self):
+        player = self.player
+        return (self.current_screen.screen_id, player.x, player.y, tuple(player.gravity_velocity), player.doublejump_available,
+                player.jump_held, player.jumping, player.dead, player._state, self.frame, self.death_frame)
+
+    def load_state(self, state):
+        player = self.player
+        if state[0] != self.current_screen.screen_id:
+            self.current_screen.remove_object(player)
+            self.current_screen = self.current_world.screens[state[0]]
+            player.screen = self.current_screen
+            self.current_screen.add_object(player)
+        if state[7] != player.dead:
+            if state[7]:
+                player.die()
+            else:
+                player.reset()
+        player.x = state[1]
+        player.y = state[2]
+        player.gravity_velocity = list(state[3])
+        player.doublejump_available = state[4]
+        player.jump_held = state[5]
+        player.jumping = state[6]
+        player._state = state[8]
+        player.cached_collision = None
+        self.frame = state[9]
+        self.death_frame = state[10]
+
+    # (screen ID, index among the screen's objects that have a snapshot_format, packed state) for every such object in
+    # the world. Unlike Snapshot, this refers to objects by position, so it can be applied to a freshly loaded world.
+    def pack_objects(self):
+        records = []
+        for screen_id, screen in self.current_world.screens.items():
+            for batch in screen.object_batches.values():
+                batch.sync()
+            objects = [obj for obj in screen.objects if obj.snapshot_format is not None]
+            for index, obj in enumerate(objects):
+                records.append((screen_id, index, obj.pack_state()))
+        return records
+
+    def unpack_objects(self, records):
+        objects = {}
+        for screen_id, index, data in records:
+            if screen_id not in objects:
+                objects[screen_id] = [obj for obj in self.current_world.screens[screen_id].objects if obj.snapshot_format is not None]
+            objects[screen_id][index].unpack_state(data)
+        for screen_id in objects:
+            for batch in self.current_world.screens[screen_id].object_batches.values():
+                batch.invalidate()
+        self.rest_objects()
+
+    @staticmethod
+    def pack_screen_objects(screen):
+        for batch in screen.object_batches.values():
+            batch.sync()
+        return tuple((obj, obj.pack_state()) for obj in screen.objects if obj.snapshot_format is not None)
+
+    # Objects are wherever they are now; snapshots from before this cannot be restored.
+    def rest_objects(self):
+        self.awake_screens = []
+        self.resting_objects = {}
+        self.pristine_objects = {}
+
+    # Packs the objects of the screens falling asleep, and of the screens waking for the first time since rest_objects,
+    # before anything ticks them.
+    def wake_screens(self, screens):
+        dozing = [screen for screen in self.awake_screens if screen not in screens]
+        if dozing:
+            self.resting_objects = self.resting_objects.copy()
+            for screen in dozing:
+                self.resting_objects[screen.screen_id] = Simulation.pack_screen_objects(screen)
+        for screen in screens:
+            if screen.screen_id not in self.pristine_objects:
+                self.pristine_objects[screen.screen_id] = Simulation.pack_screen_objects(screen)
+        self.awake_screens = screens
+
+    # save_state plus the objects of the awake screens, packed for the rewind buffer. Sleeping screens only change when
+    # they wake, which packs them, so their states are shared with the previous snapshot.
+    def snapshot(self):
+        player = self.player
+        gv = player.gravity_velocity
+        objects = tuple(item for screen in self.awake_screens for item in Simulation.pack_screen_objects(screen))
+        return Snapshot(self.current_screen.screen_id, self.frame, self.death_frame,
+                        PLAYER_FORMAT.pack(player.x, player.y, gv[0], gv[1], player.doublejump_available, player.jump_held, player.jumping, player.dead),
+                        player._state, objects, self.ticked_frames.copy(), self.awake_screens, self.resting_objects)
+
+    # Only screens whose objects may have changed since the snapshot are unpacked: the awake ones, then and now, and the
+    # ones that fell asleep in between.
+    def restore(self, snapshot):
+        x, y, gvx, gvy, doublejump_available, jump_held, jumping, dead = PLAYER_FORMAT.unpack(snapshot.player)
+        self.load_state((snapshot.screen_id, x, y, (gvx, gvy), doublejump_available, jump_held, jumping, dead, snapshot.player_state,
+                         snapshot.frame, snapshot.death_frame))
+        for obj, data in snapshot.objects:
+            obj.unpack_state(data)
+        touched = list(snapshot.awake_screens)
+        for screen_id, pristine in self.pristine_objects.items():
+            screen = self.current_world.screens[screen_id]
+            if screen in snapshot.awake_screens:
+                continue
+            objects = snapshot.resting_objects.get(screen_id, pristine)
+            if screen in self.awake_screens or objects is not self.resting_objects.get(screen_id, pristine):
+                for obj, data in objects:
+                    obj.unpack_state(data)
+                touched.append(screen)
+        for screen in touched:
+            for batch in screen.object_batches.values():
+                batch.invalidate()
+        self.awake_screens = snapshot.awake_screens
+        self.resting_objects = snapshot.resting_objects
+        self.ticked_frames = snapshot.ticked_frames.copy()
+
+    def kill_player(self):
+        self.player.die()
+        self.death_frame = self.frame
+
+    def transition(self, id):
+        self.current_screen.remove_object(self.player)
+        self.current_screen = self.current_world.screens[self.current_screen.transitions[id]]
+        if id == 0:
+            self.player.x = 0
+        elif id == 1:
+            self.player.y = Screen.SCREEN_SIZE_H - len(self.player.hitbox)
+        elif id == 2:
+            self.player.x = Screen.SCREEN_SIZE_W - len(self.player.hitbox[0])
+        elif id == 3:
+            self.player.y = 0
+        self.current_screen.add_object(self.player)
+
+    # Active screen first, then the adjacent screens in transition order (E, N, W, S) if enabled.
+    def scheduled_screens(self):
+        screens = [self.current_screen]
+        if self.tick_adjacent_screens:
+            for screen_id in self.current_screen.transitions:
+                if screen_id and screen_id in self.current_world.screens:
+                    screen = self.current_world.screens[screen_id]
+                    if screen not in screens:
+                        screens.append(screen)
+        return screens
+
+    # Ticks the objects of every scheduled screen: batched objects first, then the rest in the order they were added.
+    # A screen that was asleep is first fast-forwarded over the frames it missed.
+    def tick_objects(self):
+        screens = self.scheduled_screens()
+        if screens != self.awake_screens:
+            self.wake_screens(screens)
+        for screen in screens:
+            behind = self.frame - 1 - self.ticked_frames.get(screen.screen_id, 0)
+            for batch in screen.object_batches.values():
+                batch.tick(behind)
+            for obj in screen.objects:
+                if obj is self.player or obj.batch_class is not None:
+                    continue
+                if behind > 0:
+                    obj.fast_forward(behind)
+                obj.tick()
+            self.ticked_frames[screen.screen_id] = self.frame
+
+    def run(self, input_provider, frames):
+        for i in range(frames):
+            self.step(input_provider.poll())
+
+    # Colliders right under the player's feet, which carry the player when they move.
+    def supporting_colliders(self):
+        player = self.player
+        hitbox = compile_hitbox(player.hitbox)
+        px = int(player.x)
+        py = int(player.y)
+        feet = [px + xo for start, end in hitbox.spans[-1] for xo in range(start, end)]
+        found = []
+        for obj in self.current_screen.colliders_in_rect(pygame.Rect(px, py + hitbox.height, hitbox.width, 1)):
+            if obj.hitbox_type & COLLISIONTEST_PREVENTS_MOVEMENT:
+                below = obj.compiled_hitbox
+                ox = int(obj.x)
+                oy = int(obj.y)
+                if any(below.is_set(fx - ox, py + hitbox.height - oy) for fx in feet):
+                    found.append(obj)
+        return found
+
+    # Moves the player along with the colliders it stood on, horizontally only as far as nothing is in the way.
+    def carry_player(self, colliders):
+        dx = 0
+        dy = 0
+        for obj in colliders:
+            if abs(obj.dx) > abs(dx):
+                dx = obj.dx
+            if abs(obj.dy) > abs(dy):
+                dy = obj.dy
+        if dx == 0 and dy == 0:
+            return
+        player = self.player
+        coll = self.current_screen.test_screen_collision(int(player.x + dx), int(player.y + dy), player.hitbox, self.step_collision)
+        if dx != 0 and coll[4][0] & COLLISIONTEST_PREVENTS_MOVEMENT:
+            dx = 0
+        player.move_to(player.x + dx, player.y + dy)
+        player.cached_collision = None
+
+    # Advances the world by one frame with the given InputState.
+    def step(self, inputs):
+        self.frame += 1
+        supporting = None if self.player.dead else self.supporting_colliders()
+        colliders_version = self.current_screen.colliders_version
+        self.tick_objects()
+        if self.player.dead:
+            return
+        if self.current_screen.colliders_version != colliders_version:
+            self.player.cached_collision = None
+        if supporting:
+            self.carry_player(supporting)
+        # print("==== Running simulation for frame")
+        if self.player.cached_collision is None:
+            self.player.cached_collision = self.current_screen.test_screen_collision(int(self.player.x), int(self.player.y), self.player.hitbox, self.player.collision_result)
+            # print("Checking initial collision at {0} {1} - result: {2}".format(int(self.player.x), int(self.player.y), self.player.cached_collision))
+        if self.player.cached_collision[4][0] & CollisionTest.DEADLY:
+            self.kill_player()
+            self.player.cached_collision = None
+            return
+        if self.player.cached_collision[4][0] & COLLISIONTEST_PREVENTS_MOVEMENT:
+            self.player.y -= 1
+            self.player.cached_collision = None
+            # print("Frame failed: player overlapping solid object")
+            return
+        if self.player.cached_collision[4][0] & COLLISIONTEST_TRANSITIONS:
+            if self.player.cached_collision[4][0] & CollisionTest.TRANSITION_EAST and self.current_screen.transitions[0]:
+                self.transition(0)
+                self.player.cached_collision = None
+                return
+            elif self.player.cached_collision[4][0] & CollisionTest.TRANSITION_NORTH and self.current_screen.transitions[1]:
+                self.transition(1)
+                self.player.cached_collision = None
+                return
+            elif self.player.cached_collision[4][0] & CollisionTest.TRANSITION_WEST and self.current_screen.transitions[2]:
+                self.transition(2)
+                self.player.cached_collision = None
+                return
+            elif self.player.cached_collision[4][0] & CollisionTest.TRANSITION_SOUTH and self.current_screen.transitions[3]:
+                self.transition(3)
+                self.player.cached_collision = None
+                return
+            else:
+                print("BUG: Collision flag {0} but no valid transition in direction(s)".format(self.player.cached_collision[4][0]))
+        cancel_dirs = []
+        grav_dirs = []
+        gx = self.current_screen.gravity[0]
+        gy = self.current_screen.gravity[1]
+        gv = self.player.gravity_velocity
+        tv = Simulation.terminal_velocity
+        prevent_doublejump = False
+        # gv = [bound(gv[0] + gx, -tv if gx < 0 else -2 * tv, tv if gx > 0 else 2 * tv), bound(gv[1] + gy, -tv if gy < 0 else -2 * tv, tv if gy > 0 else 2 * tv)]
+        if gx != 0:
+            if gx < 0:
+                grav_dirs.append(2)
+            else:
+                grav_dirs.append(0)
+        if gy != 0:
+            if gy < 0:
+                grav_dirs.append(1)
+            else:
+                grav_dirs.append(3)
+        jump_available = False
+        forces = self.current_screen.contact_forces_at(int(self.player.x), int(self.player.y), self.player.hitbox)
+        if any(force.suppresses_gravity for force in forces):
+            gv = [0, 0]
+            prevent_doublejump = True
+            self.player.jumping = False
+        else:
+            gv = [bound(gv[0] + gx, -tv, tv), bound(gv[1] + gy, -tv, tv)]
+            if gv[0] != 0:
+                if gv[0] < 0:
+                    cancel_dirs.append(2)
+                else:
+                    cancel_dirs.append(0)
+            if gv[1] != 0:
+                if gv[1] < 0:
+                    cancel_dirs.append(1)
+                else:
+                    cancel_dirs.append(3)
+            for el in cancel_dirs:
+                if self.player.cached_collision[el][0] & COLLISIONTEST_PREVENTS_MOVEMENT:
+                    if el in (0, 2):
+                        gv[0] = 0
+                    else:
+                        gv[1] = 0
+        for el in grav_dirs:
+            if self.player.cached_collision[el][0] & COLLISIONTEST_PREVENTS_MOVEMENT:
+                jump_available = True
+                if self.player.doublejump_available < 1:
+                    self.player.doublejump_available = 1
+                self.player.jumping = False
+
+        # if gx:
+        #    tgvrx = tv / gx
+        # else:
+        #     tgvrx = 0
+
+        # if gy:
+        #     tgvry = tv / gy
+        # else:
+        #     tgvry = 0
+
+        mvx = 0
+        mvy = 0
+        change_facing = 0
+        if inputs[Controls.LEFT]:
+            mvx += -Simulation.movement_speed
+            change_facing = -1
+        if inputs[Controls.RIGHT]:
+            mvx += Simulation.movement_speed
+            if change_facing == -1:
+                change_facing = 0
+            else:
+                change_facing = 1
+        if inputs[Controls.JUMP]:
+            if not self.player.jump_held:
+                self.player.jump_held = True
+                if jump_available:
+                    # gv[0] += tgvrx * -gx
+                    # gv[1] += tgvry * -gy
+                    gv[0] += -gx * self.current_screen.jump_frames
+                    gv[1] += -gy * self.current_screen.jump_frames
+                    self.player.jumping = True
+                elif self.player.doublejump_available > 0 and not prevent_doublejump:
+                    if gx:
+                        if (gv[0] < 0 and gx < 0) or (gv[0] > 0 and gx > 0):
+                            gv[0] = 0
+                    if gy:
+                        if (gv[1] < 0 and gy < 0) or (gv[1] > 0 and gy > 0):
+                            gv[1] = 0
+                    # gv[0] += tgvrx * -gx * Simulation.doublejump_strength
+                    # gv[1] += tgvry * -gy * Simulation.doublejump_strength
+                    gv[0] += -gx * self.current_screen.jump_frames * Simulation.doublejump_strength
+                    gv[1] += -gy * self.current_screen.jump_frames * Simulation.doublejump_strength
+                    self.player.jumping = True
+                    self.player.doublejump_available -= 1
+        else:
+            if self.player.jump_held:
+                self.player.jump_held = False
+                if self.player.jumping:
+                    self.player.jumping = False
+                    if gx:
+                        if (gv[0] < 0 and gx > 0) or (gv[0] > 0 and gx < 0):
+                            gv[0] = 0
+                    if gy:
+                        if (gv[1] < 0 and gy > 0) or (gv[1] > 0 and gy < 0):
+                            gv[1] = 0
+
+        self.player.gravity_velocity = gv
+        self.player.movement_velocity = [mvx, mvy]
+
+        conveyor_velocity = [0, 0]
+        for force in forces:
+            if force.vx:
+                conveyor_velocity[0] += Simulation.movement_speed * force.vx
+            if force.vy:
+                conveyor_velocity[1] += Simulation.movement_speed * force.vy
+
+        if change_facing:
+            if change_facing < 0:
+                if self.player.state != "moving_left":
+                    self.player.state = "moving_left"
+            else:
+                if self.player.state != "moving_right":
+                    self.player.state = "moving_right"
+        elif self.player.state != "stop_left" and self.player.state != "stop_right":
+            if self.player.state == "moving_left":
+                self.player.state = "stop_left"
+            else:
+                self.player.state = "stop_right"
+
+        sumv = (gv[0] + mvx + conveyor_velocity[0], gv[1] + mvy + conveyor_velocity[1])
+        dest = [self.player.x + sumv[0], self.player.y + sumv[1]]
+        sgnx = -1 if sumv[0] < 0 else 1
+        sgny = -1 if sumv[1] < 0 else 1
+        prevent_y = False
+        if not sumv[1] or self.player.cached_collision[1 if sgny < 0 else 3][0] & COLLISIONTEST_PREVENTS_MOVEMENT:
+            prevent_y = True
+            dest[1] = self.player.y
+        movement = Movement(self.player.x, self.player.y, sumv, dest, False, prevent_y, 0)
+        if sumv[0]:
+            xdir = 2 if sgnx < 0 else 0
+            if self.player.cached_collision[xdir][0] & COLLISIONTEST_PREVENTS_MOVEMENT:
+                sloping = movement.slope_ahead(self.current_screen, int(self.player.x), int(self.player.y), compile_hitbox(self.player.hitbox), self.player.bottom_pixel, self.player.cached_collision)
+                if sloping is None:
+                    movement.prevent_x = True
+                    dest[0] = self.player.x
+                else:
+                    movement.sloping = sloping
+        else:
+            movement.prevent_x = True
+            dest[0] = self.player.x
+        if self.movement_resolver == MovementResolver.SWEPT:
+            alive = self.move_swept(movement)
+        else:
+            alive = self.move_stepped(movement)
+        if not alive:
+            self.kill_player()
+            return
+        self.player.x = movement.dest[0]
+        self.player.y = movement.dest[1]
+        self.player.cached_collision = None
+
+    # Reference resolver: a full collision query for every pixel stepped.
+    def move_stepped(self, movement):
+        hitbox = compile_hitbox(self.player.hitbox)
+        while True:
+            pt = movement.advance()
+            if pt is None:
+                return True
+            coll = self.current_screen.test_screen_collision(pt[0], pt[1], hitbox, self.step_collision)
+            if not movement.resolve(self.current_screen, pt, coll, hitbox, self.player.bottom_pixel):
+                return False
+            self.player.x = pt[0]
+            self.player.y = pt[1]
+
+    # Sweeps the hitbox along the remaining path. If nothing in the swept area can kill the player, and nothing
+    # in the swept edge pixels of an axis that is still moving can block it, there is no contact and the path is
+    # taken in one go. Otherwise the path is queried in one batch and resolved up to the first contact that changes
+    # the constraints on the movement, after which the rest of the path is swept again.
+    def move_swept(self, movement):
+        hitbox = compile_hitbox(self.player.hitbox)
+        w = hitbox.width
+        h = hitbox.height
+        while True:
+            plan = movement.copy()
+            points = []
+            pt = plan.advance()
+            while pt is not None:
+                points.append(pt)
+                pt = plan.advance()
+            if not points:
+                return True
+            if not movement.sloping:
+                x0 = min(pt[0] for pt in points)
+                y0 = min(pt[1] for pt in points)
+                dx = max(pt[0] for pt in points) - x0
+                dy = max(pt[1] for pt in points) - y0
+                contact = self.current_screen.collision_area_flags(x0, y0, dx + w, dy + h) & (CollisionTest.DEADLY | COLLISIONTEST_PREVENTS_MOVEMENT)
+                # Edge bounds are indexed like collision results: [E, N, W, S]
+                if not contact and not movement.prevent_x:
+                    contact = self.swept_edge_flags(hitbox.edge_bounds[0 if movement.sgnx > 0 else 2], x0, y0, dx, dy)
+                if not contact and not movement.prevent_y:
+                    contact = self.swept_edge_flags(hitbox.edge_bounds[3 if movement.sgny > 0 else 1], x0, y0, dx, dy)
+                if not contact:
+                    return True
+            colls = self.current_screen.test_screen_collision_batch(points, hitbox, self.sweep_collisions)
+            for pt, coll in zip(points, colls):
+                movement.advance()
+                constraints = movement.constraints()
+                if not movement.resolve(self.current_screen, pt, coll, hitbox, self.player.bottom_pixel):
+                    return False
+                self.player.x = pt[0]
+                self.player.y = pt[1]
+                if movement.constraints() != constraints:
+                    break
+            else:
+                return True
+
+    def swept_edge_flags(self, edge, x0, y0, dx, dy):
+        if edge is None:
+            return 0
+        return self.current_screen.collision_area_flags(x0 + edge[0], y0 + edge[1], dx + edge[2], dy + edge[3]) & COLLISIONTEST_PREVENTS_MOVEMENT
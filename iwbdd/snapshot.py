@@ -0,0 +1,60 @@
+import struct
+
+
+# Player: (<8> X, <8> Y, <8> Gravity velocity X, <8> Gravity velocity Y, <1> Double jumps available, <1> Jump held,
+#          <1> Jumping, <1> Dead)
+PLAYER_FORMAT = struct.Struct("<ddddB???")
+
+
+# The full simulation state at the start of a frame. Object states are packed with each object's snapshot_format; only
+# objects that declare one are captured, and only those of the awake screens are packed anew. Sleeping screens are
+# represented by the Simulation's resting states at the time, which snapshots share.
+class Snapshot:
+    __slots__ = ("screen_id", "frame", "death_frame", "player", "player_state", "objects", "ticked_frames", "awake_screens",
+                 "resting_objects")
+
+    def __init__(self, screen_id, frame, death_frame, player, player_state, objects, ticked_frames, awake_screens, resting_objects):
+        self.screen_id = screen_id
+        self.frame = frame
+        self.death_frame = death_frame
+        self.player = player
+        self.player_state = player_state
+        # ((object, packed state), ...)
+        self.objects = objects
+        self.ticked_frames = ticked_frames
+        self.awake_screens = awake_screens
+        # Screen ID -> ((object, packed state), ...)
+        self.resting_objects = resting_objects
+
+
+# Fixed number of the most recent snapshots; pushing past capacity overwrites the oldest.
+class SnapshotRing:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.snapshots = [None] * capacity
+        self.head = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        for i in range(self.capacity):
+            self.snapshots[i] = None
+        self.head = 0
+        self.count = 0
+
+    def push(self, snapshot):
+        self.snapshots[self.head] = snapshot
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def pop(self):
+        if self.count == 0:
+            return None
+        self.head = (self.head - 1) % self.capacity
+        self.count -= 1
+        snapshot = self.snapshots[self.head]
+        self.snapshots[self.head] = None
+        return snapshot
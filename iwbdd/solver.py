@@ -0,0 +1,157 @@
+from .simulation import Simulation, InputState, Controls
+from .run_file import RunFile
+from .screen import Screen
+from .tileset import Tileset
+from collections import deque
+
+
+# Tiles the player's hitbox has touched on one screen, and the exits found out of it.
+class ScreenReachability:
+    def __init__(self, screen_id):
+        self.screen_id = screen_id
+        # One byte per tile, row major
+        self.tiles = bytearray(Screen.SCREEN_W * Screen.SCREEN_H)
+        # Destination screen ID -> RunFile reaching it from the world's start
+        self.exits = {}
+        self.states = 0
+
+    def mark(self, x, y, w, h):
+        tx0 = max(0, int(x) // Tileset.TILE_W)
+        ty0 = max(0, int(y) // Tileset.TILE_H)
+        tx1 = min(Screen.SCREEN_W - 1, (int(x) + w - 1) // Tileset.TILE_W)
+        ty1 = min(Screen.SCREEN_H - 1, (int(y) + h - 1) // Tileset.TILE_H)
+        for ty in range(ty0, ty1 + 1):
+            row = ty * Screen.SCREEN_W
+            for tx in range(tx0, tx1 + 1):
+                self.tiles[row + tx] = 1
+
+    def reachable(self, tx, ty):
+        return self.tiles[ty * Screen.SCREEN_W + tx] == 1
+
+    def reachable_count(self):
+        return sum(self.tiles)
+
+
+# Breadth-first search over quantized player states. Each edge is a macro action: one combination of controls held
+# for macro_frames frames of the real simulation step. States are deduplicated by packing their quantized fields into
+# a single int, paired with the quantized object positions when the screen has any. Branches start from full snapshots,
+# so moving objects are restored along with the player. Every visited state keeps only its parent index and the action
+# that led to it, so exits can be turned back into input sequences.
+class LevelSolver:
+    default_macro_frames = 6
+    default_max_states = 200000
+    # Pixels per quantization step of the position, and velocity units per step of the gravity velocity
+    position_step = 2
+    velocity_step = 0.25
+    macro_actions = (
+        0,
+        1 << Controls.LEFT,
+        1 << Controls.RIGHT,
+        1 << Controls.JUMP,
+        (1 << Controls.LEFT) | (1 << Controls.JUMP),
+        (1 << Controls.RIGHT) | (1 << Controls.JUMP),
+    )
+
+    def __init__(self, world_file, macro_frames=None, max_states=None, movement_resolver=None):
+        self.world_file = world_file
+        self.macro_frames = macro_frames if macro_frames is not None else LevelSolver.default_macro_frames
+        self.max_states = max_states if max_states is not None else LevelSolver.default_max_states
+        self.simulation = Simulation()
+        if movement_resolver is not None:
+            self.simulation.movement_resolver = movement_resolver
+        self.simulation.load_world_from_file(world_file)
+        self.simulation.create_player()
+        # Per visited state: (parent index, macro action index)
+        self.parents = []
+        self.visited = set()
+        self.screens = {}
+        self.start = None
+        # Empty run holding the search's starting point
+        self.start_run = None
+
+    # phase is object_phase() of the state; platforms in other places make it a different state.
+    def state_key(self, state, phase=()):
+        gv = state[3]
+        key = state[0]
+        key = key * 4096 + int(state[1] // LevelSolver.position_step) + 1024
+        key = key * 4096 + int(state[2] // LevelSolver.position_step) + 1024
+        key = key * 1024 + int(round(gv[0] / LevelSolver.velocity_step)) + 512
+        key = key * 1024 + int(round(gv[1] / LevelSolver.velocity_step)) + 512
+        key = key * 16 + min(state[4], 15)
+        key = key * 4 + (2 if state[5] else 0) + (1 if state[6] else 0)
+        return (key, phase) if phase else key
+
+    # Where the current screen's stateful objects are, quantized like the player's position. Which way they are heading
+    # is left out; at this resolution the positions pin the phase down closely enough for reachability.
+    def object_phase(self):
+        return tuple((int(obj.x) // LevelSolver.position_step, int(obj.y) // LevelSolver.position_step)
+                     for obj in self.simulation.current_screen.objects if obj.snapshot_format is not None)
+
+    def screen(self, screen_id):
+        reachability = self.screens.get(screen_id)
+        if reachability is None:
+            reachability = ScreenReachability(screen_id)
+            self.screens[screen_id] = reachability
+        return reachability
+
+    # Builds the run from the world's start to the state at index, optionally followed by the first frames of one more
+    # macro action.
+    def input_sequence(self, index, action=None, action_frames=None):
+        actions = []
+        while index is not None:
+            parent, parent_action = self.parents[index]
+            if parent_action is not None:
+                actions.append(parent_action)
+            index = parent
+        actions.reverse()
+        run = self.start_run.restart()
+        for parent_action in actions:
+            for i in range(self.macro_frames):
+                run.append(LevelSolver.macro_actions[parent_action])
+        if action is not None:
+            for i in range(self.macro_frames if action_frames is None else action_frames):
+                run.append(LevelSolver.macro_actions[action])
+        return run
+
+    def solve(self):
+        sim = self.simulation
+        world = sim.current_world
+        sim.place_player(world.starting_screen_id, world.start_x, world.start_y)
+        hitbox_w = len(sim.player.hitbox[0])
+        hitbox_h = len(sim.player.hitbox)
+        self.start = sim.snapshot()
+        self.start_run = RunFile()
+        self.start_run.start_from(sim, self.world_file)
+        self.visited.add(self.state_key(sim.save_state(), self.object_phase()))
+        self.parents.append((None, None))
+        queue = deque([(0, self.start)])
+        inputs = InputState()
+        while queue and len(self.parents) < self.max_states:
+            index, snapshot = queue.popleft()
+            for action, held in enumerate(LevelSolver.macro_actions):
+                sim.restore(snapshot)
+                inputs.held = held
+                screen_id = snapshot.screen_id
+                reachability = self.screen(screen_id)
+                for frame in range(self.macro_frames):
+                    sim.step(inputs)
+                    if sim.player.dead:
+                        break
+                    if sim.current_screen.screen_id != screen_id:
+                        screen_id = sim.current_screen.screen_id
+                        if screen_id not in reachability.exits:
+                            run = self.input_sequence(index, action, frame + 1)
+                            run.finish(sim)
+                            reachability.exits[screen_id] = run
+                        reachability = self.screen(screen_id)
+                    reachability.mark(sim.player.x, sim.player.y, hitbox_w, hitbox_h)
+                if sim.player.dead:
+                    continue
+                key = self.state_key(sim.save_state(), self.object_phase())
+                if key in self.visited:
+                    continue
+                self.visited.add(key)
+                self.screen(sim.current_screen.screen_id).states += 1
+                self.parents.append((index, action))
+                queue.append((len(self.parents) - 1, sim.snapshot()))
+        return self.screens
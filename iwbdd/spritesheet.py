@@ -1,4 +1,4 @@
-from .common import eofc_read
+from .common import eofc_read, scale_cells
 import struct
 import pygame
 from io import BytesIO
@@ -62,13 +62,15 @@ class Spritesheet:
         self.cell_h = 0
         self.applied_color = None
         self._applied_color = None
+        # (cell width, cell height) -> image_surface_colored with every cell scaled to that size
+        self.scaled = {}
         if reader is not None:
             self.read_spritesheet_data(reader)
 
     def read_spritesheet_data(self, reader):
         self.spritesheet_id = struct.unpack('<L', eofc_read(reader, 4))[0]
         spritesheet_name_len = struct.unpack('<L', eofc_read(reader, 4))[0]
-        self.spritesheet_name = eofc_read(reader, spritesheet_name_len)
+        self.spritesheet_name = eofc_read(reader, spritesheet_name_len).decode('ascii')
         self.cell_w = struct.unpack('<L', eofc_read(reader, 4))[0]
         self.cell_h = struct.unpack('<L', eofc_read(reader, 4))[0]
         data_len = struct.unpack('<L', eofc_read(reader, 4))[0]
@@ -83,7 +85,22 @@ class Spritesheet:
                 temp.fill(self.applied_color)
                 self.image_surface_colored.blit(temp, (0, 0), None, BLEND_RGB_MULT)
             self._applied_color = self.applied_color
+            self.scaled = {}
 
-    def draw_cell_to(self, target, x, y, draw_x, draw_y):
+    def scaled_to(self, cell_w, cell_h):
         self.check_applied_color()
-        target.blit(self.image_surface_colored, (draw_x, draw_y), pygame.Rect(x * self.cell_w, y * self.cell_h, self.cell_w, self.cell_h))
+        if (cell_w, cell_h) not in self.scaled:
+            cols = self.image_surface_colored.get_width() // self.cell_w
+            rows = self.image_surface_colored.get_height() // self.cell_h
+            self.scaled[(cell_w, cell_h)] = scale_cells(self.image_surface_colored, self.cell_w, self.cell_h, cols, rows, cell_w, cell_h)
+        return self.scaled[(cell_w, cell_h)]
+
+    # With scale, an (x, y) factor, draw_x and draw_y are in unscaled pixels and the cell is drawn from the scaled sheet.
+    def draw_cell_to(self, target, x, y, draw_x, draw_y, scale=None):
+        if scale is None:
+            self.check_applied_color()
+            target.blit(self.image_surface_colored, (draw_x, draw_y), pygame.Rect(x * self.cell_w, y * self.cell_h, self.cell_w, self.cell_h))
+            return
+        cell_w = round(self.cell_w * scale[0])
+        cell_h = round(self.cell_h * scale[1])
+        target.blit(self.scaled_to(cell_w, cell_h), (int(draw_x * scale[0]), int(draw_y * scale[1])), pygame.Rect(x * cell_w, y * cell_h, cell_w, cell_h))
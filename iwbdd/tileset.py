@@ -1,4 +1,4 @@
-from .common import eofc_read
+from .common import eofc_read, scale_cells
 import struct
 import pygame
 from io import BytesIO
@@ -47,6 +47,10 @@ class Tileset:
         self.image_surface = None
         self.tiles_w = 0
         self.tiles_h = 0
+        # (ts_x, ts_y) -> source rect in image_surface; fully transparent tiles are left out, as they draw nothing
+        self.tile_rects = {}
+        # (tile width, tile height) -> (scaled image, tile_rects at that size)
+        self.scaled = {}
         if reader is not None:
             self.read_tileset_data(reader)
 
@@ -57,6 +61,27 @@ class Tileset:
         self.image_surface = pygame.image.load(BytesIO(raw_png)).convert_alpha()
         self.tiles_w = self.image_surface.get_width() / Tileset.TILE_W
         self.tiles_h = self.image_surface.get_height() / Tileset.TILE_H
+        self.build_tile_rects()
+
+    def build_tile_rects(self):
+        self.tile_rects = {}
+        for ts_y in range(int(self.tiles_h)):
+            for ts_x in range(int(self.tiles_w)):
+                rect = pygame.Rect(ts_x * Tileset.TILE_W, ts_y * Tileset.TILE_H, Tileset.TILE_W, Tileset.TILE_H)
+                if self.image_surface.subsurface(rect).get_bounding_rect().width > 0:
+                    self.tile_rects[(ts_x, ts_y)] = rect
+        self.scaled = {}
+
+    # The tileset with every tile scaled to tile_w by tile_h, built once per size.
+    def scaled_to(self, tile_w, tile_h):
+        key = (tile_w, tile_h)
+        if key not in self.scaled:
+            image = scale_cells(self.image_surface, Tileset.TILE_W, Tileset.TILE_H, int(self.tiles_w), int(self.tiles_h), tile_w, tile_h)
+            tile_rects = {}
+            for ts_x, ts_y in self.tile_rects:
+                tile_rects[(ts_x, ts_y)] = pygame.Rect(ts_x * tile_w, ts_y * tile_h, tile_w, tile_h)
+            self.scaled[key] = (image, tile_rects)
+        return self.scaled[key]
 
     def draw_to(self, tiles_x, tiles_y, tiles_w, tiles_h, dest_surf, dest_area):
         if Tileset.draw_surface is None or Tileset.draw_surface_w != tiles_w or Tileset.draw_surface_h != tiles_h:
@@ -16,18 +16,22 @@ setup(
     ],
     packages=find_packages(),
     install_requires=[
-        "pygame"
+        "pygame",
+        "numpy"
     ],
     entry_points={
         'console_scripts': [
             'iwbdd_tsp=iwbdd.iwbdd:pack_tilesets',
             'iwbdd_bgp=iwbdd.iwbdd:pack_backgrounds',
-            'iwbdd_ssp=iwbdd.iwbdd:pack_spritesheets'
+            'iwbdd_ssp=iwbdd.iwbdd:pack_spritesheets',
+            'iwbdd_runs=iwbdd.iwbdd:run_batch',
+            'iwbdd_solve=iwbdd.iwbdd:solve_world'
         ],
         'gui_scripts': [
             'iwbdd=iwbdd.iwbdd:main',
             'iwbdd_editor=iwbdd.iwbdd:editor',
-            'iwbdd_editor_scaled=iwbdd.iwbdd:editor_scaled'
+            'iwbdd_editor_scaled=iwbdd.iwbdd:editor_scaled',
+            'iwbdd_world_tester=iwbdd.iwbdd:world_tester'
         ],
     }
 )
@@ -0,0 +1,27 @@
+import os
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Worlds and asset packs are opened relative to the repository root, as the entry points do.
+@pytest.fixture(scope="session", autouse=True)
+def assets():
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    from iwbdd.spritesheet import read_spritesheets
+    from iwbdd.tileset import read_tilesets
+    from iwbdd.background import read_backgrounds
+    read_spritesheets("spritesheets.sss")
+    # Worlds are only written out with the tilesets and backgrounds they refer to loaded
+    read_tilesets("tilesets.tls")
+    read_backgrounds("backgrounds.bgs")
+    yield
+    os.chdir(cwd)
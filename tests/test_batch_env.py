@@ -0,0 +1,60 @@
+import pytest
+import numpy
+from iwbdd.batch_env import BatchEnvironment
+from iwbdd.simulation import Simulation, InputState
+from iwbdd.world import World
+
+
+# World files carry no objects; platforms are added once the world is loaded, the same way in every simulation.
+def add_platforms(world):
+    from iwbdd.moving_platform import MovingPlatform, PlatformBatch
+    for screen_id, screen in world.screens.items():
+        # Enough platforms to be stepped as a batch under the start, a few stepped one by one everywhere else
+        for i in range(PlatformBatch.min_size + 2 if screen_id == world.starting_screen_id else 3):
+            screen.add_object(MovingPlatform(screen, 32 * i, 300, {"dest_pos": (32 * i, 250), "speed": 0.004 + 0.0005 * i}))
+
+
+def started_simulation(world_file, tick_adjacent_screens):
+    simulation = Simulation()
+    simulation.tick_adjacent_screens = tick_adjacent_screens
+    simulation.load_world_from_file(world_file)
+    simulation.create_player()
+    add_platforms(simulation.current_world)
+    world = simulation.current_world
+    simulation.place_player(world.starting_screen_id, world.start_x, world.start_y)
+    return simulation
+
+
+# Every instance has to play out as it would in a Simulation of its own, objects on the screens it left asleep included.
+@pytest.mark.parametrize("tick_adjacent_screens", [False, True])
+def test_instances_match_their_own_simulations(tmp_path, tick_adjacent_screens):
+    # Screen 2 is open and borders screen 1 to the west; starting at its west edge, random play crosses back and forth
+    world = World("world1.wld")
+    world.starting_screen_id = 2
+    world.start_x = 4
+    world.start_y = 240
+    world_file = str(tmp_path / "world.wld")
+    world.write_to(world_file)
+    count = 6
+    env = BatchEnvironment(world_file, count)
+    env.simulation.tick_adjacent_screens = tick_adjacent_screens
+    add_platforms(env.simulation.current_world)
+    env.reset()
+    references = [started_simulation(world_file, tick_adjacent_screens) for i in range(count)]
+    rng = numpy.random.default_rng(0)
+    inputs = InputState()
+    for frame in range(300):
+        actions = rng.integers(0, 2, size=(count, 4))
+        actions[:, 3] = 0
+        if frame == 150:
+            env.reset(numpy.arange(count) % 2 == 0)
+            references[::2] = [started_simulation(world_file, tick_adjacent_screens) for i in range(0, count, 2)]
+        env.step(actions)
+        for i, simulation in enumerate(references):
+            if not simulation.player.dead:
+                inputs.held = int((actions[i] * BatchEnvironment.control_bits).sum())
+                simulation.step(inputs)
+            env.simulation.restore(env.snapshots[i])
+            assert env.simulation.save_state() == simulation.save_state(), "instance {0}, frame {1}".format(i, frame)
+            assert env.simulation.pack_objects() == simulation.pack_objects(), "instance {0}, frame {1}".format(i, frame)
+    assert sum(len(visited) > 1 for visited in env.visited) > 1
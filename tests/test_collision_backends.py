@@ -0,0 +1,57 @@
+import pytest
+import random
+from iwbdd.object import generate_rectangle_hitbox
+from iwbdd.screen import Screen, CollisionBackend, CollisionResult
+from iwbdd.world import World
+
+
+HITBOXES = [generate_rectangle_hitbox(11, 21), generate_rectangle_hitbox(32, 16), [[1, 0, 1], [0, 1, 0], [1, 1, 0]], [[1]]]
+
+
+def query_all_backends(screen, x, y, hitbox):
+    results = []
+    for backend in CollisionBackend:
+        screen.collision_backend = backend
+        results.append(screen.test_screen_collision(x, y, hitbox, CollisionResult()))
+    screen.collision_backend = Screen.default_collision_backend
+    return results
+
+
+# Queries off the screen's edges included, where transitions decide what is out of bounds.
+@pytest.mark.parametrize("screen_id", [1, 2, 3])
+def test_backends_agree_without_colliders(monkeypatch, screen_id):
+    monkeypatch.setattr(Screen, "collision_cache_size", 0)
+    screen = World("world1.wld").screens[screen_id]
+    rng = random.Random(screen_id)
+    for i in range(1500):
+        hitbox = rng.choice(HITBOXES)
+        x = rng.randint(-40, Screen.SCREEN_SIZE_W + 8)
+        y = rng.randint(-40, Screen.SCREEN_SIZE_H + 8)
+        surface, tiles, flags = query_all_backends(screen, x, y, hitbox)
+        assert surface == tiles == flags, "({0}, {1}): {2} {3} {4}".format(x, y, surface, tiles, flags)
+
+
+@pytest.mark.parametrize("screen_id", [1, 2, 3])
+def test_backends_agree_next_to_colliders(monkeypatch, screen_id):
+    from iwbdd.moving_platform import MovingPlatform
+    monkeypatch.setattr(Screen, "collision_cache_size", 0)
+    screen = World("world1.wld").screens[screen_id]
+    rng = random.Random(screen_id)
+    platforms = [MovingPlatform(screen, rng.randint(0, Screen.SCREEN_SIZE_W - 32), rng.randint(0, Screen.SCREEN_SIZE_H - 16)) for i in range(8)]
+    for platform in platforms:
+        screen.add_object(platform)
+    seen = 0
+    for i in range(1500):
+        platform = rng.choice(platforms)
+        hitbox = rng.choice(HITBOXES)
+        x = int(platform.x) + rng.randint(-len(hitbox[0]) - 2, 34)
+        y = int(platform.y) + rng.randint(-len(hitbox) - 2, 18)
+        surface, tiles, flags = query_all_backends(screen, x, y, hitbox)
+        assert surface == tiles == flags, "({0}, {1}): {2} {3} {4}".format(x, y, surface, tiles, flags)
+        screen.remove_object(platform)
+        alone = query_all_backends(screen, x, y, hitbox)
+        screen.add_object(platform)
+        if alone[0] != flags:
+            seen += 1
+    # The platforms did get in the way of some of the queries
+    assert seen > 0
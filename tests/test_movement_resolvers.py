@@ -0,0 +1,37 @@
+import pytest
+from iwbdd.simulation import Simulation, InputState, Controls, MovementResolver
+
+RIGHT = 1 << Controls.RIGHT
+LEFT = 1 << Controls.LEFT
+JUMP = 1 << Controls.JUMP
+
+
+# Screen 2 of world1 is open air over x 400-880, y 80-440.
+def trace(resolver, dest, start, held, frames):
+    from iwbdd.moving_platform import MovingPlatform
+    simulation = Simulation()
+    simulation.movement_resolver = resolver
+    simulation.load_world_from_file("world1.wld")
+    simulation.create_player()
+    simulation.place_player(2, start[0], start[1])
+    screen = simulation.current_screen
+    platform = MovingPlatform(screen, 500, 400, {"dest_pos": dest, "speed": 0.002})
+    screen.add_object(platform)
+    player = simulation.player
+    states = []
+    for i in range(frames):
+        simulation.step(InputState(held(i)))
+        states.append((player.x, player.y, player.dead, platform.x, platform.y))
+    return states
+
+
+@pytest.mark.parametrize("dest, start, held", [
+    ((500, 400), (505, 100), lambda i: 0),
+    ((650, 400), (510, 385), lambda i: 0),
+    ((350, 400), (510, 385), lambda i: 0),
+    ((500, 300), (505, 100), lambda i: 0),
+    ((650, 330), (505, 385), lambda i: RIGHT if i % 60 < 10 else 0),
+    ((620, 360), (505, 100), lambda i: (RIGHT if i % 90 < 40 else LEFT) | (JUMP if i % 50 < 10 else 0)),
+])
+def test_swept_matches_stepped_with_colliders(dest, start, held):
+    assert trace(MovementResolver.SWEPT, dest, start, held, 300) == trace(MovementResolver.STEPPED, dest, start, held, 300)
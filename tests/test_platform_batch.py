@@ -0,0 +1,46 @@
+import pytest
+from iwbdd.simulation import Simulation, InputState
+
+
+def platform_run(batched):
+    from iwbdd.moving_platform import MovingPlatform, PlatformBatch
+    simulation = Simulation()
+    simulation.load_world_from_file("world1.wld")
+    simulation.create_player()
+    screen = simulation.current_world.screens[2]
+    platforms = [MovingPlatform(screen, 400 + 22 * i, 420, {"dest_pos": (400 + 22 * i, 300), "speed": 0.003 + 0.0004 * i})
+                 for i in range(PlatformBatch.min_size + 4)]
+    for platform in platforms:
+        screen.add_object(platform)
+    simulation.place_player(2, 518, 380)
+    states = []
+    inputs = InputState()
+    snapshot = None
+    for frame in range(400):
+        if frame == 100 or frame == 150:
+            # Leave the platforms' screen and come back, so it sleeps and wakes behind
+            state = list(simulation.save_state())
+            state[0] = 1 if frame == 100 else 2
+            simulation.load_state(tuple(state))
+        elif frame == 200:
+            snapshot = simulation.snapshot()
+        elif frame == 260:
+            simulation.restore(snapshot)
+        batch_size = PlatformBatch.min_size
+        if not batched:
+            PlatformBatch.min_size = len(platforms) + 1
+        try:
+            simulation.step(inputs)
+        finally:
+            PlatformBatch.min_size = batch_size
+        # Packing syncs the batch's columns back into the platforms: t, forward, x, y, dx and dy
+        states.append((simulation.save_state(), tuple(packed for obj, packed in Simulation.pack_screen_objects(screen))))
+    return states
+
+
+# At least min_size platforms take the vectorized path; the scalar MovingPlatform.tick is the reference.
+def test_batch_matches_scalar_ticks_across_wake_and_restore():
+    batched = platform_run(True)
+    scalar = platform_run(False)
+    for frame, (b, s) in enumerate(zip(batched, scalar)):
+        assert b == s, "frame {0}".format(frame)
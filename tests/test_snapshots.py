@@ -0,0 +1,42 @@
+import pytest
+import random
+from iwbdd.simulation import Simulation, InputState
+
+
+def state_of(simulation):
+    from iwbdd.moving_platform import MovingPlatform
+    screens = simulation.current_world.screens.values()
+    return (simulation.save_state(), dict(simulation.ticked_frames),
+            tuple((obj.t, obj.forward, obj.x, obj.y) for screen in screens for obj in screen.objects if isinstance(obj, MovingPlatform)))
+
+
+# Jumps to random earlier snapshots while moving the player between screens, so sleeping screens wake and doze in between.
+@pytest.mark.parametrize("tick_adjacent_screens", [False, True])
+def test_restore_brings_back_every_screen(tick_adjacent_screens):
+    from iwbdd.moving_platform import MovingPlatform
+    simulation = Simulation()
+    simulation.tick_adjacent_screens = tick_adjacent_screens
+    simulation.load_world_from_file("world1.wld")
+    simulation.create_player()
+    world = simulation.current_world
+    for screen in world.screens.values():
+        for i in range(3):
+            screen.add_object(MovingPlatform(screen, 100 + 200 * i, 300, {"dest_pos": (300 + 200 * i, 250), "speed": 0.007 * (i + 1)}))
+    simulation.place_player(world.starting_screen_id, world.start_x, world.start_y)
+    rnd = random.Random(5)
+    snapshots = []
+    states = []
+    for i in range(3000):
+        if snapshots and (simulation.player.dead or rnd.random() < 0.005):
+            index = rnd.randrange(len(snapshots))
+            simulation.restore(snapshots[index])
+            assert state_of(simulation) == states[index]
+            del snapshots[index:]
+            del states[index:]
+        snapshots.append(simulation.snapshot())
+        states.append(state_of(simulation))
+        if rnd.random() < 0.01:
+            state = list(simulation.save_state())
+            state[0] = rnd.choice(sorted(world.screens))
+            simulation.load_state(tuple(state))
+        simulation.step(InputState(rnd.randrange(8)))